@@ -1,6 +1,6 @@
 import os
 from flask import Flask
-from app.database import init_db, Session
+from app.database import Session
 
 
 def create_app():
@@ -8,23 +8,56 @@ def create_app():
     app = Flask(__name__)
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
 
-    # 初始化資料庫
-    with app.app_context():
-        init_db()
-
     # 註冊路由藍圖
-    from app.routes import home, expenses, repayments, adjustments, reports
+    from app.routes import home, expenses, repayments, adjustments, reports, api, search
     app.register_blueprint(home.bp)
     app.register_blueprint(expenses.bp)
     app.register_blueprint(repayments.bp)
     app.register_blueprint(adjustments.bp)
     app.register_blueprint(reports.bp)
+    app.register_blueprint(api.bp)
+    app.register_blueprint(search.bp)
+
+    # 請求延遲/回應大小/進行中請求指標
+    from app import metrics
+    metrics.init_app(app)
+
+    # 逐請求 SQL 分析（SQL_PROFILE=1 或 X-SQL-Profile: 1 標頭）
+    from app import profiler
+    profiler.init_app(app)
+
+    # 靜態資源雜湊網址/長效快取/預先壓縮檔 + 動態回應 gzip
+    # （最後註冊的 after_request 最先執行：壓縮後指標記錄的是實際傳輸大小）
+    from app import assets
+    assets.init_app(app)
+
+    # 註冊 CLI 指令
+    from app import cli
+    cli.register(app)
 
     # 健康檢查端點（容器編排系統需要）
     @app.route('/health')
     def health_check():
         return {'status': 'healthy'}, 200
 
+    # 報表快取命中統計（本 worker）
+    @app.route('/health/cache')
+    def cache_stats():
+        from app.cache import report_cache
+        return report_cache.stats(), 200
+
+    # Prometheus 指標（所有 worker 彙總）
+    @app.route('/metrics')
+    def prometheus_metrics():
+        return metrics.render()
+
+    # 資料庫連線池狀態（本 worker）
+    @app.route('/health/pool')
+    def pool_stats():
+        from app.database import get_engine
+        from app.pool import pool_stats
+        return pool_stats(get_engine()), 200
+
     # 清理 session（每次請求結束後）
     @app.teardown_appcontext
     def shutdown_session(exception=None):
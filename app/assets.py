@@ -0,0 +1,173 @@
+"""前端靜態資源：內容雜湊網址、長效快取、預先壓縮檔，以及動態回應 gzip
+
+建置（Docker 建置時執行，見 Dockerfile）：
+1. npm run build：複製 vendored htmx / Chart.js 到 static/vendor/，Tailwind 編譯為 static/css/app.css
+2. flask --app main assets build：static/ 下的檔案複製到 static/dist/，檔名加上內容雜湊，
+   另產生 .gz / .br（需安裝 brotli）與 manifest.json
+
+執行時模板以 asset_url('css/app.css') 取得雜湊網址（內容不變網址就不變，可永久快取）；
+未建置 dist 時回傳原始網址。連 npm run build 都未執行（剛 clone 的開發環境）時，
+vendored JS 改用 package.json 釘選版本的 CDN 網址，樣式由 base.html 改用 Tailwind Play CDN。
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+
+from flask import current_app, request, send_from_directory, url_for
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # 只在建置時需要；未安裝時只產生 .gz
+    brotli = None
+
+DIST = 'dist'
+MANIFEST = 'manifest.json'
+
+# 雜湊檔名的靜態檔快取一年（內容變動時網址也會變）
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+# 預先壓縮的副檔名與大小下限（太小的檔案壓縮後反而變大）
+PRECOMPRESS_EXTENSIONS = {'.css', '.js', '.json', '.svg', '.txt', '.map'}
+PRECOMPRESS_MIN_SIZE = 512
+
+# 未執行 npm run build 時的替代網址（版本與 package.json 相同）
+CDN_FALLBACKS = {
+    'vendor/htmx.min.js': 'https://unpkg.com/htmx.org@1.9.10/dist/htmx.min.js',
+    'vendor/chart.umd.js': 'https://cdn.jsdelivr.net/npm/chart.js@4.4.0/dist/chart.umd.js',
+}
+
+# 客戶端偏好順序：br 優先於 gzip
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+# 動態回應 gzip：類型、大小下限與壓縮等級（6 為速度與壓縮率的折衷）
+COMPRESS_MIMETYPES = {'text/html', 'application/json', 'text/plain', 'text/css', 'application/javascript'}
+COMPRESS_MIN_SIZE = 500
+COMPRESS_LEVEL = 6
+
+
+def build(static_folder, echo=print):
+    """產生 dist/（雜湊檔名 + .gz/.br + manifest.json），回傳 manifest {原始路徑: 雜湊路徑}"""
+    dist = os.path.join(static_folder, DIST)
+    shutil.rmtree(dist, ignore_errors=True)
+
+    if brotli is None:
+        echo("⚠️  未安裝 brotli，只產生 .gz")
+
+    manifest = {}
+    for root, dirs, files in os.walk(static_folder):
+        dirs[:] = sorted(d for d in dirs if os.path.join(root, d) != dist)
+        for name in sorted(files):
+            if name.startswith('.'):
+                continue
+            source = os.path.join(root, name)
+            path = os.path.relpath(source, static_folder).replace(os.sep, '/')
+            with open(source, 'rb') as f:
+                data = f.read()
+
+            stem, ext = os.path.splitext(path)
+            hashed = f'{DIST}/{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}'
+            target = os.path.join(static_folder, hashed)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, 'wb') as f:
+                f.write(data)
+
+            if ext in PRECOMPRESS_EXTENSIONS and len(data) >= PRECOMPRESS_MIN_SIZE:
+                # mtime=0：相同內容產生相同 .gz（建置可重現）
+                with open(target + '.gz', 'wb') as f:
+                    f.write(gzip.compress(data, compresslevel=9, mtime=0))
+                if brotli is not None:
+                    with open(target + '.br', 'wb') as f:
+                        f.write(brotli.compress(data, quality=11))
+
+            manifest[path] = hashed
+            echo(f"  {path} → {hashed}")
+
+    with open(os.path.join(dist, MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+    return manifest
+
+
+def load_manifest(static_folder):
+    """讀取 dist/manifest.json（未建置時為空）"""
+    try:
+        with open(os.path.join(static_folder, DIST, MANIFEST), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def asset_exists(path):
+    """模板用：資源是否已建置（dist manifest 或 static/ 下有檔案）"""
+    return (
+        path in current_app.extensions['asset_manifest']
+        or os.path.isfile(os.path.join(current_app.static_folder, path))
+    )
+
+
+def asset_url(path):
+    """模板用：靜態檔網址（已建置時為內容雜湊網址，vendored 檔不存在時為 CDN 網址）"""
+    manifest = current_app.extensions['asset_manifest']
+    if path in manifest:
+        return url_for('static', filename=manifest[path])
+    if path in CDN_FALLBACKS and not asset_exists(path):
+        return CDN_FALLBACKS[path]
+    return url_for('static', filename=path)
+
+
+def send_static(filename):
+    """static 端點：dist/ 下的雜湊檔長效快取，並依 Accept-Encoding 送出預先壓縮檔"""
+    if not filename.startswith(DIST + '/'):
+        return current_app.send_static_file(filename)
+
+    static_folder = current_app.static_folder
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    for encoding, suffix in ENCODINGS:
+        compressed = safe_join(static_folder, filename + suffix)
+        if request.accept_encodings[encoding] and compressed and os.path.isfile(compressed):
+            response = send_from_directory(
+                static_folder, filename + suffix, mimetype=mimetype, max_age=IMMUTABLE_MAX_AGE
+            )
+            response.content_encoding = encoding
+            break
+    else:
+        response = send_from_directory(static_folder, filename, mimetype=mimetype, max_age=IMMUTABLE_MAX_AGE)
+
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def _compress_response(response):
+    """動態回應（HTML / JSON）gzip；串流回應（匯出）與檔案回應不處理"""
+    if response.mimetype not in COMPRESS_MIMETYPES or response.direct_passthrough or response.is_streamed:
+        return response
+
+    response.vary.add('Accept-Encoding')
+    if (
+        response.content_encoding
+        or response.status_code < 200 or response.status_code in (204, 304)
+        or not request.accept_encodings['gzip']
+    ):
+        return response
+
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_SIZE:
+        return response
+
+    response.set_data(gzip.compress(data, compresslevel=COMPRESS_LEVEL))
+    response.content_encoding = 'gzip'
+    return response
+
+
+def init_app(app):
+    """載入 manifest、註冊 asset_url 模板函式、static 端點與動態回應壓縮"""
+    app.extensions['asset_manifest'] = load_manifest(app.static_folder)
+    app.add_template_global(asset_url)
+    app.add_template_global(asset_exists)
+    app.view_functions['static'] = send_static
+    app.after_request(_compress_response)
@@ -0,0 +1,102 @@
+"""報表結果快取：以資料表版本戳記失效（戳記存在資料庫，所有 worker 共用）"""
+import os
+import threading
+from collections import OrderedDict
+
+from flask import g, has_request_context
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.models import DataStamp
+
+
+def bump(connection, tables):
+    """資料表版本 +1（於寫入交易內呼叫，commit 後其他 worker 即可看到）"""
+    for table in sorted(tables):
+        stmt = insert(DataStamp).values(table_name=table, version=1, updated_at=func.now())
+        connection.execute(
+            stmt.on_conflict_do_update(
+                index_elements=['table_name'],
+                set_={'version': DataStamp.version + 1, 'updated_at': func.now()}
+            )
+        )
+
+
+def current_stamps(db):
+    """讀取所有資料表戳記 {table: (version, updated_at)}（同一請求只查一次）"""
+    if has_request_context() and '_data_stamps' in g:
+        return g._data_stamps
+
+    stamps = {
+        table: (version, updated_at)
+        for table, version, updated_at in db.execute(
+            select(DataStamp.table_name, DataStamp.version, DataStamp.updated_at)
+        )
+    }
+    if has_request_context():
+        g._data_stamps = stamps
+    return stamps
+
+
+def data_versions(db, tables):
+    """指定資料表的版本組合（未曾寫入的表視為版本 0）"""
+    stamps = current_stamps(db)
+    return tuple((table, stamps.get(table, (0, None))[0]) for table in sorted(tables))
+
+
+class ResultCache:
+    """行程內 LRU 快取（容量上限 + 命中/未命中計數）"""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        # 計算時不持有鎖；同時未命中的請求可能各算一次，結果相同
+        value = compute()
+
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+report_cache = ResultCache(int(os.getenv('REPORT_CACHE_SIZE', '256')))
+
+
+def cached(db, view, tables, params, compute):
+    """以 (view, 已解析的參數, 相關資料表版本) 為 key 快取計算結果
+
+    版本先於資料讀取，計算期間若有新寫入，結果只會存在舊版本 key 下而被淘汰。
+    """
+    versions = data_versions(db, tables)
+    key = (view, tuple(sorted((k, str(v)) for k, v in params.items())), versions)
+    return report_cache.get_or_compute(key, compute)
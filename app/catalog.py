@@ -0,0 +1,95 @@
+"""類別目錄：每個 worker 載入一次，路由查類別不需再往返資料庫
+
+5 個類別在 init_db 時固定建立；修改 active 等欄位時由 after_flush 事件
+呼叫 refresh()，並遞增 categories 版本戳記。請求中使用目錄時比對該戳記
+（與條件式 GET / 報表快取共用同一次 data_stamps 查詢），其他 worker 於下一個請求即重新載入。
+"""
+import threading
+from collections import namedtuple
+
+from flask import has_request_context
+
+from app.models import Category, CategoryEnum
+from app import cache
+
+CategoryInfo = namedtuple('CategoryInfo', ['id', 'name', 'active'])
+
+
+class CategoryCatalog:
+    """CategoryEnum ↔ id 對照表"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._categories = None
+        self._version = None
+        self._by_id = {}
+        self._by_name = {}
+
+    def _current_version(self, db):
+        """categories 資料表版本；請求外（CLI 匯入等）不比對，沿用已載入的目錄"""
+        if not has_request_context():
+            return None
+        return cache.data_versions(db, ['categories'])[0][1]
+
+    def _is_fresh(self, categories, version):
+        return categories is not None and (version is None or version == self._version)
+
+    def _load(self, db):
+        version = self._current_version(db)
+        categories = self._categories
+        if self._is_fresh(categories, version):
+            return categories
+
+        with self._lock:
+            if not self._is_fresh(self._categories, version):
+                rows = db.query(Category.id, Category.name, Category.active).all()
+                # 依 CategoryEnum 定義順序排列，與下拉選單/按鈕順序一致
+                order = {member: index for index, member in enumerate(CategoryEnum)}
+                infos = sorted(
+                    (CategoryInfo(*row) for row in rows),
+                    key=lambda info: order.get(info.name, len(order))
+                )
+                self._by_id = {info.id: info for info in infos}
+                self._by_name = {info.name: info for info in infos}
+                self._categories = infos
+                self._version = version
+            return self._categories
+
+    def refresh(self):
+        """清除已載入的目錄，下次使用時重新查詢"""
+        with self._lock:
+            self._categories = None
+
+    def active(self, db):
+        """所有啟用的類別（用於下拉選單/按鈕）"""
+        return [info for info in self._load(db) if info.active]
+
+    def id_for(self, db, name):
+        """CategoryEnum → 類別 id（不存在時回傳 None）"""
+        self._load(db)
+        info = self._by_name.get(name)
+        return info.id if info else None
+
+    def get(self, db, category_id):
+        """類別 id → CategoryInfo（不存在時回傳 None）"""
+        self._load(db)
+        return self._by_id.get(category_id)
+
+    def labels(self, db):
+        """{類別 id: 顯示名稱}"""
+        self._load(db)
+        return {category_id: info.name.value for category_id, info in self._by_id.items()}
+
+
+catalog = CategoryCatalog()
+
+
+def after_flush(session, flush_context):
+    """類別有異動時刷新目錄，並讓依賴類別的報表快取失效"""
+    touched = [
+        obj for obj in (*session.new, *session.dirty, *session.deleted)
+        if isinstance(obj, Category)
+    ]
+    if touched:
+        cache.bump(session.connection(), {'categories'})
+        catalog.refresh()
@@ -0,0 +1,142 @@
+"""Flask CLI 指令（flask --app main <指令>）"""
+import click
+from flask.cli import AppGroup
+
+from app.database import Session
+from app import ledger
+
+ledger_cli = AppGroup('ledger', help='總額摘要、類別×月份彙總與月底快照維護')
+
+
+@ledger_cli.command('verify')
+def ledger_verify():
+    """比對總額摘要、彙總與快照和原始資料"""
+    db = Session()
+    try:
+        drift = ledger.verify(db)
+        if not drift:
+            click.echo("✅ 總額摘要、彙總與快照皆與原始資料一致")
+            return
+
+        for column, (stored, actual) in drift.items():
+            click.echo(f"❌ {column}: 摘要 {stored} / 實際 {actual}")
+        raise SystemExit(1)
+    finally:
+        db.close()
+
+
+@ledger_cli.command('rebuild')
+def ledger_rebuild():
+    """從原始資料重新計算總額摘要、彙總與快照（回填）"""
+    db = Session()
+    try:
+        summary = ledger.rebuild(db)
+        db.commit()
+        click.echo(f"✅ 總額摘要、彙總與快照已重建，總額 {summary.balance}")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+@click.command('import-csv')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--chunk-size', default=None, type=int, help='每批寫入筆數')
+@click.option('--dry-run', is_flag=True, help='只驗證不寫入（最後 rollback）')
+def import_csv(path, chunk_size, dry_run):
+    """從 CSV 批次匯入（格式同 reports 匯出，支援 .gz）"""
+    import time
+    from app import importer
+
+    db = Session()
+    try:
+        started = time.perf_counter()
+        with open(path, 'rb') as f:
+            result = importer.import_csv(
+                db, importer.open_text(f, path), chunk_size or importer.DEFAULT_CHUNK_SIZE
+            )
+        elapsed = time.perf_counter() - started
+
+        for issue in result.errors:
+            click.echo(f"❌ 第 {issue.line} 列: {issue.message}")
+
+        if dry_run:
+            db.rollback()
+        else:
+            db.commit()
+
+        rate = result.total_inserted / elapsed if elapsed else 0
+        click.echo(
+            f"{'🔍 驗證' if dry_run else '✅ 匯入'} {result.total_inserted} 筆"
+            f"（支出 {result.inserted['expenses']} / 還款 {result.inserted['repayments']}"
+            f" / 調整 {result.inserted['adjustments']}），錯誤 {len(result.errors)} 列，"
+            f"{elapsed:.1f} 秒（{rate:,.0f} 筆/秒）"
+        )
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+@click.command('init-db')
+def init_db_command():
+    """建表、建立 5 固定類別與總額摘要（部署時執行一次）"""
+    from app.database import init_db
+
+    init_db()
+
+
+db_cli = AppGroup('db', help='資料庫結構遷移')
+
+
+@db_cli.command('upgrade')
+@click.option('--target', default=None, type=int, help='只套用到此版本')
+def db_upgrade(target):
+    """套用待執行的遷移（索引以 CONCURRENTLY 建立，不鎖寫入）"""
+    from app.database import get_engine
+    from app import migrations
+
+    try:
+        count = migrations.upgrade(get_engine(), target, echo=click.echo)
+    except RuntimeError as e:
+        raise click.ClickException(str(e)) from e
+    click.echo(f"✅ 已套用 {count} 個遷移" if count else "ℹ️  資料庫結構已是最新")
+
+
+@db_cli.command('status')
+def db_status():
+    """列出各遷移版本與套用時間"""
+    from app.database import get_engine
+    from app import migrations
+
+    with get_engine().begin() as connection:
+        applied = migrations.applied_versions(connection)
+
+    for migration in migrations.MIGRATIONS:
+        applied_at = applied.get(migration.version)
+        mark = f"✅ {applied_at:%Y-%m-%d %H:%M}" if applied_at else "⏳ 待執行"
+        click.echo(f"{migration.version:04d} {migration.name:<28} {mark}")
+
+
+assets_cli = AppGroup('assets', help='前端靜態資源')
+
+
+@assets_cli.command('build')
+def assets_build():
+    """產生內容雜湊檔名、.gz/.br 預先壓縮檔與 manifest（先執行 npm run build）"""
+    from flask import current_app
+    from app import assets
+
+    manifest = assets.build(current_app.static_folder, echo=click.echo)
+    click.echo(f"✅ 已建置 {len(manifest)} 個靜態檔")
+
+
+def register(app):
+    """註冊 CLI 指令"""
+    app.cli.add_command(init_db_command)
+    app.cli.add_command(ledger_cli)
+    app.cli.add_command(db_cli)
+    app.cli.add_command(import_csv)
+    app.cli.add_command(assets_cli)
@@ -0,0 +1,109 @@
+"""條件式 GET：以資料表版本戳記產生 ETag / Last-Modified，未變動時直接回 304
+
+ETag = hash(端點, 路徑參數, 查詢參數, 相關資料表版本, 今天日期, 模板與資源 manifest)：
+- 寫入會遞增版本（cache.bump），頁面即失效
+- 「本月」等預設區間與首頁顯示隨日期變動，因此納入今天日期
+- 部署新模板或重新建置前端資源（雜湊網址改變）後內容不同，因此納入模板與資源 manifest 摘要
+
+比對成功時只讀一次 data_stamps，不執行任何彙總查詢。
+有待顯示的 flash 訊息時不做條件式回應（304 會讓訊息留到下一頁才出現）。
+"""
+import hashlib
+import json
+import os
+from datetime import datetime
+from functools import wraps
+
+from flask import current_app, make_response, request, session
+
+from app import cache
+from app.database import Session
+from app.models import taipei_today, taipei_tz
+
+_deploy_digest_cache = None
+
+
+def _deploy_digest():
+    """模板目錄內容 + 資源 manifest 摘要（各 worker 相同，每個行程只算一次）"""
+    global _deploy_digest_cache
+    if _deploy_digest_cache is None:
+        digest = hashlib.sha1()
+        folder = os.path.join(current_app.root_path, current_app.template_folder)
+        for root, dirs, files in sorted(os.walk(folder)):
+            dirs.sort()
+            for name in sorted(files):
+                with open(os.path.join(root, name), 'rb') as f:
+                    digest.update(name.encode())
+                    digest.update(f.read())
+        digest.update(json.dumps(current_app.extensions.get('asset_manifest', {}), sort_keys=True).encode())
+        _deploy_digest_cache = digest.hexdigest()
+    return _deploy_digest_cache
+
+
+def validators(db, tables, view_args):
+    """本請求的 (etag, last_modified)"""
+    today = taipei_today()
+    stamps = cache.current_stamps(db)
+    versions = cache.data_versions(db, tables)
+
+    digest = hashlib.sha1()
+    for part in (
+        request.endpoint,
+        sorted((k, str(v)) for k, v in view_args.items()),
+        sorted(request.args.items(multi=True)),
+        versions,
+        today.isoformat(),
+        _deploy_digest(),
+    ):
+        digest.update(repr(part).encode())
+        digest.update(b'\0')
+
+    # 日期換日也會改變內容，Last-Modified 至少為今天 0 點（台北時間）
+    last_modified = taipei_tz.localize(datetime(today.year, today.month, today.day))
+    for table in tables:
+        updated_at = stamps.get(table, (0, None))[1]
+        if updated_at is not None and updated_at > last_modified:
+            last_modified = updated_at
+
+    return digest.hexdigest()[:32], last_modified
+
+
+def _not_modified(etag, last_modified):
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since:
+        return last_modified.replace(microsecond=0) <= request.if_modified_since
+    return False
+
+
+def _set_validators(response, etag, last_modified):
+    response.set_etag(etag, weak=True)
+    response.last_modified = last_modified
+    # 每次都向伺服器驗證（避免瀏覽器依 Last-Modified 自行判斷新鮮度而顯示舊資料）
+    response.cache_control.no_cache = True
+    response.cache_control.private = True
+    return response
+
+
+def conditional(tables=()):
+    """視圖裝飾器：GET 請求附 ETag / Last-Modified，比對成功回 304
+
+    tables 為內容所依賴的資料表，或接收路徑參數、回傳資料表清單的函式。
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**view_args):
+            if request.method != 'GET' or session.get('_flashes'):
+                return view(**view_args)
+
+            depends = tables(**view_args) if callable(tables) else tables
+            etag, last_modified = validators(Session(), depends, view_args)
+            if _not_modified(etag, last_modified):
+                return _set_validators(current_app.response_class(status=304), etag, last_modified)
+
+            response = make_response(view(**view_args))
+            if response.status_code == 200:
+                _set_validators(response, etag, last_modified)
+            return response
+        return wrapper
+    return decorator
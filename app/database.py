@@ -1,28 +1,81 @@
 import os
-from sqlalchemy import create_engine
+import threading
+from sqlalchemy import create_engine, event, inspect
 from sqlalchemy.orm import sessionmaker, scoped_session
 from dotenv import load_dotenv
 
 from app.models import Base, Category, CategoryEnum
+from app import ledger, catalog, pool, metrics, profiler
 
 load_dotenv()
 
-DATABASE_URL = os.getenv('DATABASE_URL')
-if not DATABASE_URL:
-    raise ValueError("DATABASE_URL 環境變數未設定，請檢查 .env 檔案")
+_engine = None
+_engine_lock = threading.Lock()
 
-# 建立資料庫引擎
-engine = create_engine(DATABASE_URL, pool_pre_ping=True, echo=False)
 
-# 建立 session factory
-session_factory = sessionmaker(bind=engine)
-Session = scoped_session(session_factory)
+def get_engine():
+    """取得資料庫引擎（第一次使用時才建立，import 時不連線）"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                database_url = os.getenv('DATABASE_URL')
+                if not database_url:
+                    raise ValueError("DATABASE_URL 環境變數未設定，請檢查 .env 檔案")
+                _engine = create_engine(database_url, echo=False, **pool.engine_options())
+                metrics.instrument_engine(_engine)
+                profiler.instrument_engine(_engine)
+    return _engine
+
+
+def dispose_engine():
+    """捨棄繼承自父行程的連線（gunicorn post_fork 呼叫，避免多個 worker 共用 socket）"""
+    if _engine is not None:
+        _engine.dispose(close=False)
+
+
+def warm_up_engine():
+    """worker 啟動時預先建立連線（DB_POOL_WARMUP 條，預設 0 = 不預熱）"""
+    if os.getenv('DATABASE_URL'):
+        return pool.warm_up(get_engine())
+    return 0
+
+
+# 建立 session factory（建立 session 時才綁定引擎）
+session_factory = sessionmaker()
+Session = scoped_session(lambda: session_factory(bind=get_engine()))
+
+# 寫入支出/還款/調整時，於同一交易內更新總額摘要
+event.listen(session_factory, 'after_flush', ledger.after_flush)
+# 類別異動時刷新行程內的類別目錄
+event.listen(session_factory, 'after_flush', catalog.after_flush)
 
 
 def init_db():
-    """初始化資料庫：建表 + 插入 5 固定類別"""
+    """初始化資料庫：建表 + 插入 5 固定類別 + 總額摘要與月底快照
+
+    由 `flask init-db` 在部署時執行一次，不在 app factory / worker 啟動時執行。
+    """
+    from app import search, migrations
+
+    engine = get_engine()
+    fresh = not inspect(engine).has_table('expenses')
+
+    with engine.begin() as connection:
+        search.create_extension(connection)
+
     Base.metadata.create_all(engine)
 
+    # 新資料庫已由 create_all 建出最新結構（含索引），直接標記遷移為已套用；
+    # 既有資料庫只提示，遷移（CONCURRENTLY 建索引）由 flask db upgrade 執行
+    with engine.begin() as connection:
+        if fresh:
+            migrations.stamp(connection)
+        else:
+            waiting = migrations.pending(connection)
+            if waiting:
+                print(f"ℹ️  有 {len(waiting)} 個資料庫遷移待執行，請執行 flask db upgrade")
+
     # 插入 5 固定類別（如果不存在）
     session = Session()
     try:
@@ -35,6 +88,12 @@ def init_db():
             print("✅ 已插入 5 固定類別")
         else:
             print(f"ℹ️  類別已存在 ({existing_count} 筆)")
+
+        # 總額摘要/月底快照不存在時，從現有資料建立
+        if ledger.needs_rebuild(session):
+            ledger.rebuild(session)
+            session.commit()
+            print("✅ 已建立總額摘要與月底快照")
     except Exception as e:
         session.rollback()
         print(f"❌ 初始化類別失敗: {e}")
@@ -0,0 +1,38 @@
+"""HTMX 片段回應
+
+帶 HX-Request 標頭的寫入請求只回傳新增/變動的表格列，訊息與總額/摘要卡以 out-of-band
+（hx-swap-oob）一併更新，不重新導向、不重繪整頁；一般表單提交維持原本的 flash + 重新導向。
+列與卡片的 HTML 來自模板巨集（_rows.html / _fragments.html），整頁與片段共用同一份標記。
+"""
+from flask import get_template_attribute, make_response, request
+from markupsafe import Markup
+
+
+def is_htmx():
+    """是否為 HTMX 發出的請求（歷史紀錄還原請求需要整頁，不算）"""
+    return request.headers.get('HX-Request') == 'true' and not request.headers.get('HX-History-Restore-Request')
+
+
+def render_macro(template, name, *args, **kwargs):
+    """呼叫模板巨集，回傳 HTML"""
+    return get_template_attribute(template, name)(*args, **kwargs)
+
+
+def fragment(*parts, message=None, category='success', trigger=None):
+    """片段回應：各部分 HTML 串接，message 以 out-of-band 更新訊息區，trigger 為要在發出請求的元素上觸發的事件"""
+    body = Markup('').join(parts)
+    if message:
+        body += render_macro('_fragments.html', 'flash_messages', [(category, message)], oob=True)
+    response = make_response(body)
+    if trigger:
+        response.headers['HX-Trigger'] = trigger
+    # 同一網址依 HX-Request 回傳整頁或片段，快取須分開
+    response.vary.add('HX-Request')
+    return response
+
+
+def message(text, category='error'):
+    """只更新訊息區（驗證失敗/錯誤），不替換目標元素"""
+    response = fragment(message=text, category=category)
+    response.headers['HX-Reswap'] = 'none'
+    return response
@@ -0,0 +1,231 @@
+"""CSV 批次匯入：接受 reports.export 產生的三種格式，串流解析、分批寫入"""
+import csv
+import gzip
+import io
+from collections import defaultdict, namedtuple
+from datetime import date as date_type
+from decimal import Decimal, InvalidOperation
+from uuid import uuid4
+
+from sqlalchemy import insert
+
+from app.models import Expense, Repayment, Adjustment, CategoryEnum, taipei_today
+from app.catalog import catalog
+from app import ledger
+
+DEFAULT_CHUNK_SIZE = 5000
+
+# Numeric(10, 2) 可容納的最大金額
+MAX_AMOUNT = Decimal('99999999.99')
+
+EXPENSES_HEADER = ['日期', '類別', '名稱', '金額']
+REPAYMENTS_HEADER = ['日期', '金額']
+COMBINED_HEADER = ['類型', '日期', '類別', '名稱/說明', '金額']
+
+KIND_TABLES = {
+    '支出': 'expenses',
+    '還款': 'repayments',
+    '調整': 'adjustments',
+}
+
+TABLE_MODELS = {
+    'expenses': Expense,
+    'repayments': Repayment,
+    'adjustments': Adjustment,
+}
+
+ImportIssue = namedtuple('ImportIssue', ['line', 'message'])
+
+
+class RowError(ValueError):
+    """單列資料驗證失敗"""
+
+
+class ImportResult:
+    """匯入結果：各表新增筆數 + 逐列錯誤"""
+
+    def __init__(self, layout):
+        self.layout = layout
+        self.inserted = defaultdict(int)
+        self.errors = []
+
+    @property
+    def total_inserted(self):
+        return sum(self.inserted.values())
+
+
+def detect_layout(header):
+    """依標題列判斷格式（expenses / repayments / combined）"""
+    header = [column.strip() for column in header]
+    if header == EXPENSES_HEADER:
+        return 'expenses'
+    if header == REPAYMENTS_HEADER:
+        return 'repayments'
+    # 合併格式可能帶有匯出時的「累積餘額」欄，匯入時忽略
+    if header[:len(COMBINED_HEADER)] == COMBINED_HEADER:
+        return 'combined'
+    raise ValueError(f"無法辨識的 CSV 標題列: {','.join(header)}")
+
+
+def open_text(stream, filename=''):
+    """將上傳檔/檔案轉為文字串流（支援 .gz 與 UTF-8 BOM）"""
+    if filename.endswith('.gz'):
+        stream = gzip.GzipFile(fileobj=stream, mode='rb')
+    return io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+
+
+def parse_date(value):
+    value = (value or '').strip()
+    if not value:
+        return taipei_today()
+    try:
+        return date_type.fromisoformat(value)
+    except ValueError as e:
+        raise RowError(f"日期格式錯誤: {value}") from e
+
+
+def parse_amount(value):
+    try:
+        amount = Decimal((value or '').strip())
+    except InvalidOperation as e:
+        raise RowError(f"金額格式錯誤: {value}") from e
+    if not amount.is_finite() or abs(amount) > MAX_AMOUNT:
+        raise RowError(f"金額超出範圍: {value}")
+    return amount
+
+
+def parse_text(value, field):
+    value = (value or '').strip()
+    if not value:
+        raise RowError(f"{field}不可為空")
+    if len(value) > 200:
+        raise RowError(f"{field}超過 200 字")
+    return value
+
+
+def parse_category(db, value):
+    value = (value or '').strip()
+    try:
+        category_enum = CategoryEnum(value)
+    except ValueError as e:
+        raise RowError(f"未知的類別: {value}") from e
+    category_id = catalog.id_for(db, category_enum)
+    if category_id is None:
+        raise RowError(f"類別不存在: {value}")
+    return category_id
+
+
+def parse_expense(db, day, category, name, amount):
+    return 'expenses', {
+        'category_id': parse_category(db, category),
+        'name': parse_text(name, '名稱'),
+        'amount': parse_amount(amount),
+        'date': parse_date(day),
+    }
+
+
+def parse_repayment(db, day, amount):
+    return 'repayments', {
+        'amount': parse_amount(amount),
+        'date': parse_date(day),
+    }
+
+
+def parse_adjustment(db, day, description, amount):
+    return 'adjustments', {
+        'amount': parse_amount(amount),
+        'description': parse_text(description, '說明'),
+        'date': parse_date(day),
+    }
+
+
+def parse_row(db, layout, row):
+    """解析一列為 (資料表, 欄位 dict)；格式錯誤時拋出 RowError"""
+    if layout == 'expenses':
+        if len(row) < 4:
+            raise RowError("欄位數不足")
+        return parse_expense(db, *row[:4])
+
+    if layout == 'repayments':
+        if len(row) < 2:
+            raise RowError("欄位數不足")
+        return parse_repayment(db, *row[:2])
+
+    if len(row) < 5:
+        raise RowError("欄位數不足")
+    kind, day, category, label, amount = row[:5]
+    table = KIND_TABLES.get(kind.strip())
+    if table == 'expenses':
+        return parse_expense(db, day, category, label, amount)
+    if table == 'repayments':
+        return parse_repayment(db, day, amount)
+    if table == 'adjustments':
+        return parse_adjustment(db, day, label, amount)
+    raise RowError(f"未知的類型: {kind}")
+
+
+def insert_rows(db, table, rows):
+    """批次 INSERT（executemany），並在同一交易更新總額摘要/彙總/快照
+
+    Core INSERT 不經過 ORM flush，因此彙總異動由此處依月份合併後套用。
+    """
+    if not rows:
+        return []
+
+    today = taipei_today()
+    for row in rows:
+        row.setdefault('id', uuid4())
+        row.setdefault('created_at', today)
+        row.setdefault('updated_at', today)
+        if table == 'expenses':
+            row.setdefault('reviewed', False)
+
+    db.execute(insert(TABLE_MODELS[table]), rows)
+
+    grouped = defaultdict(lambda: [Decimal('0'), 0])
+    for row in rows:
+        key = (row['date'].replace(day=1), row.get('category_id'))
+        grouped[key][0] += row['amount']
+        grouped[key][1] += 1
+    ledger.apply_changes(db.connection(), [
+        ledger.Change(table, month, category_id, amount, count)
+        for (month, category_id), (amount, count) in grouped.items()
+    ])
+
+    return [row['id'] for row in rows]
+
+
+def import_csv(db, text_stream, chunk_size=DEFAULT_CHUNK_SIZE):
+    """逐列解析 CSV 並分批寫入（呼叫端負責 commit/rollback）"""
+    reader = csv.reader(text_stream)
+    try:
+        header = next(reader)
+    except StopIteration as e:
+        raise ValueError("CSV 檔案是空的") from e
+
+    result = ImportResult(detect_layout(header))
+    pending = defaultdict(list)
+    pending_count = 0
+
+    def flush_pending():
+        for table, rows in pending.items():
+            result.inserted[table] += len(insert_rows(db, table, rows))
+        pending.clear()
+
+    for row in reader:
+        if not any(cell.strip() for cell in row):
+            continue
+        try:
+            table, values = parse_row(db, result.layout, row)
+        except RowError as e:
+            result.errors.append(ImportIssue(reader.line_num, str(e)))
+            continue
+
+        pending[table].append(values)
+        pending_count += 1
+        if pending_count >= chunk_size:
+            flush_pending()
+            pending_count = 0
+
+    flush_pending()
+    return result
@@ -0,0 +1,475 @@
+"""衍生彙總表維護（總額摘要、月底快照、類別×月份彙總）
+
+寫入時在同一交易內遞增更新，並提供重建/驗證與讀取輔助函式。
+"""
+from collections import namedtuple, defaultdict
+from datetime import date as date_type, timedelta
+from decimal import Decimal
+from uuid import UUID
+
+from sqlalchemy import delete, extract, func, inspect, select, update
+from sqlalchemy.dialects.postgresql import insert
+
+from app.models import Expense, Repayment, Adjustment, LedgerSummary, MonthlyBalance, ExpenseRollup
+from app import cache
+
+SUMMARY_ID = 1
+
+# 月底快照的 scope（只維護總額；舊版的類別 scope 已由遷移 0004 移除）
+OVERALL_SCOPE = 'all'
+
+# 單筆異動：資料表、日期、類別（僅支出）、金額增減、筆數增減
+Change = namedtuple('Change', ['table', 'date', 'category_id', 'amount', 'count'])
+
+LEDGER_MODELS = {
+    Expense: 'expenses',
+    Repayment: 'repayments',
+    Adjustment: 'adjustments',
+}
+
+SUMMARY_COLUMNS = {
+    'expenses': 'total_expenses',
+    'repayments': 'total_repayments',
+    'adjustments': 'total_adjustments',
+}
+
+# 對總額的影響：支出增加、還款減少、調整依正負值
+SIGNS = {
+    'expenses': 1,
+    'repayments': -1,
+    'adjustments': 1,
+}
+
+
+def _coerce_date(value):
+    """表單送進來的日期可能是字串"""
+    if isinstance(value, str):
+        return date_type.fromisoformat(value)
+    return value
+
+
+def _coerce_uuid(value):
+    if value is None or isinstance(value, UUID):
+        return value
+    return UUID(str(value))
+
+
+def _coerce_amount(value):
+    if value is None:
+        return Decimal('0')
+    if isinstance(value, Decimal):
+        return value
+    return Decimal(str(value))
+
+
+def _current_values(obj):
+    return (
+        _coerce_date(obj.date),
+        _coerce_uuid(getattr(obj, 'category_id', None)),
+        _coerce_amount(obj.amount),
+    )
+
+
+def _original_values(obj):
+    """取得 flush 前的欄位值（編輯前）"""
+    state = inspect(obj)
+
+    def original(key):
+        attr = state.attrs.get(key)
+        if attr is None:
+            return None
+        history = attr.history
+        if history.deleted:
+            return history.deleted[0]
+        return attr.value
+
+    return (
+        _coerce_date(original('date')),
+        _coerce_uuid(original('category_id')),
+        _coerce_amount(original('amount')),
+    )
+
+
+def collect_changes(session):
+    """從 session 待寫入的新增/修改/刪除物件整理出異動清單"""
+    changes = []
+
+    for obj in session.new:
+        table = LEDGER_MODELS.get(type(obj))
+        if table:
+            day, category_id, amount = _current_values(obj)
+            changes.append(Change(table, day, category_id, amount, 1))
+
+    for obj in session.deleted:
+        table = LEDGER_MODELS.get(type(obj))
+        if table:
+            day, category_id, amount = _original_values(obj)
+            changes.append(Change(table, day, category_id, -amount, -1))
+
+    for obj in session.dirty:
+        table = LEDGER_MODELS.get(type(obj))
+        if table and session.is_modified(obj):
+            # 編輯 = 扣除舊值 + 加上新值（未變動的欄位會互相抵銷）
+            day, category_id, amount = _original_values(obj)
+            changes.append(Change(table, day, category_id, -amount, -1))
+            day, category_id, amount = _current_values(obj)
+            changes.append(Change(table, day, category_id, amount, 1))
+
+    return changes
+
+
+def apply_changes(connection, changes):
+    """將異動套用到摘要表、月底快照與資料版本（以 col = col + delta 遞增，避免多 worker 互相覆蓋）"""
+    if not changes:
+        return
+
+    deltas = defaultdict(Decimal)
+    monthly = defaultdict(Decimal)
+    rollups = defaultdict(lambda: [Decimal('0'), 0])
+    for change in changes:
+        deltas[change.table] += change.amount
+
+        month = _month_of(change.date)
+        monthly[month] += SIGNS[change.table] * change.amount
+        if change.category_id is not None:
+            rollup = rollups[(change.category_id, month)]
+            rollup[0] += change.amount
+            rollup[1] += change.count
+
+    values = {
+        SUMMARY_COLUMNS[table]: getattr(LedgerSummary, SUMMARY_COLUMNS[table]) + delta
+        for table, delta in deltas.items()
+        if delta
+    }
+    if values:
+        connection.execute(
+            update(LedgerSummary).where(LedgerSummary.id == SUMMARY_ID).values(**values)
+        )
+
+    for month, delta in sorted(monthly.items()):
+        if delta:
+            _apply_monthly_delta(connection, month, delta)
+
+    for (category_id, month), (amount, count) in sorted(rollups.items()):
+        if amount or count:
+            _apply_rollup_delta(connection, category_id, month, amount, count)
+
+    # 資料版本 +1，讓各 worker 的報表快取失效
+    cache.bump(connection, {change.table for change in changes})
+
+
+def _month_of(day):
+    return day.replace(day=1)
+
+
+def _apply_monthly_delta(connection, month, delta):
+    """該月及之後每個月底快照都加上 delta；該月尚無快照時以前一快照為底新增"""
+    previous = (
+        select(MonthlyBalance.closing)
+        .where(MonthlyBalance.scope == OVERALL_SCOPE, MonthlyBalance.month < month)
+        .order_by(MonthlyBalance.month.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    connection.execute(
+        insert(MonthlyBalance)
+        .values(month=month, scope=OVERALL_SCOPE, closing=func.coalesce(previous, 0))
+        .on_conflict_do_nothing(index_elements=['month', 'scope'])
+    )
+    connection.execute(
+        update(MonthlyBalance)
+        .where(MonthlyBalance.scope == OVERALL_SCOPE, MonthlyBalance.month >= month)
+        .values(closing=MonthlyBalance.closing + delta)
+    )
+
+
+def _apply_rollup_delta(connection, category_id, month, amount, count):
+    """類別×月份彙總加上 delta（不存在時新增）"""
+    stmt = insert(ExpenseRollup).values(
+        category_id=category_id, month=month, total=amount, count=count
+    )
+    connection.execute(
+        stmt.on_conflict_do_update(
+            index_elements=['category_id', 'month'],
+            set_={
+                'total': ExpenseRollup.total + stmt.excluded.total,
+                'count': ExpenseRollup.count + stmt.excluded.count,
+            }
+        )
+    )
+
+
+def after_flush(session, flush_context):
+    """SQLAlchemy after_flush 事件：與資料列寫入同一交易更新摘要"""
+    apply_changes(session.connection(), collect_changes(session))
+
+
+def compute_totals(session):
+    """從原始資料表重新加總（全表掃描，僅供重建/驗證使用）"""
+    return {
+        'total_expenses': session.query(func.sum(Expense.amount)).scalar() or Decimal('0'),
+        'total_repayments': session.query(func.sum(Repayment.amount)).scalar() or Decimal('0'),
+        'total_adjustments': session.query(func.sum(Adjustment.amount)).scalar() or Decimal('0'),
+    }
+
+
+def get_summary(session):
+    return session.get(LedgerSummary, SUMMARY_ID)
+
+
+def current_balance(session):
+    """O(1) 讀取總額；摘要列不存在時退回即時加總"""
+    summary = get_summary(session)
+    if summary is not None:
+        return summary.balance
+
+    totals = compute_totals(session)
+    return totals['total_expenses'] - totals['total_repayments'] + totals['total_adjustments']
+
+
+def opening_balance(session, day):
+    """某日開始前的累積餘額：前一個月底快照 + 當月 1 日到前一日的差額"""
+    day = _coerce_date(day)
+    month = _month_of(day)
+
+    closing = session.execute(
+        select(MonthlyBalance.closing)
+        .where(MonthlyBalance.scope == OVERALL_SCOPE, MonthlyBalance.month < month)
+        .order_by(MonthlyBalance.month.desc())
+        .limit(1)
+    ).scalar() or Decimal('0')
+
+    if day == month:
+        return closing
+
+    # 當月已過的部分只掃描該月的原始資料列
+    partial = Decimal('0')
+    for model, table in LEDGER_MODELS.items():
+        total = session.query(func.sum(model.amount)).filter(
+            model.date >= month, model.date < day
+        ).scalar() or Decimal('0')
+        partial += SIGNS[table] * total
+
+    return closing + partial
+
+
+def compute_expense_groups(session):
+    """從原始資料重算類別×月份支出 {(category_id, month): (total, count)}"""
+    year = extract('year', Expense.date)
+    month = extract('month', Expense.date)
+    rows = session.query(
+        Expense.category_id, year, month, func.sum(Expense.amount), func.count(Expense.id)
+    ).group_by(Expense.category_id, year, month)
+    return {
+        (category_id, date_type(int(y), int(m), 1)): (total, count)
+        for category_id, y, m, total, count in rows
+    }
+
+
+def compute_monthly_closings(session):
+    """從原始資料重算總額月底快照 {month: closing}"""
+    net = defaultdict(Decimal)
+
+    for model, table in LEDGER_MODELS.items():
+        year = extract('year', model.date)
+        month = extract('month', model.date)
+        rows = session.query(year, month, func.sum(model.amount)).group_by(year, month)
+        for y, m, total in rows:
+            net[date_type(int(y), int(m), 1)] += SIGNS[table] * total
+
+    closings = {}
+    running = Decimal('0')
+    for month in sorted(net):
+        running += net[month]
+        closings[month] = running
+    return closings
+
+
+def rebuild(session):
+    """重新計算並覆寫摘要列、類別×月份彙總與月底快照（呼叫端負責 commit）"""
+    # 鎖住摘要列，避免重建期間其他寫入的遞增被覆蓋
+    session.execute(
+        select(LedgerSummary.id).where(LedgerSummary.id == SUMMARY_ID).with_for_update()
+    )
+    totals = compute_totals(session)
+
+    summary = get_summary(session)
+    if summary is None:
+        summary = LedgerSummary(id=SUMMARY_ID)
+        session.add(summary)
+
+    for column, value in totals.items():
+        setattr(summary, column, value)
+
+    expense_groups = compute_expense_groups(session)
+
+    session.execute(delete(ExpenseRollup))
+    if expense_groups:
+        session.execute(
+            insert(ExpenseRollup),
+            [
+                {'category_id': category_id, 'month': month, 'total': total, 'count': count}
+                for (category_id, month), (total, count) in expense_groups.items()
+            ]
+        )
+
+    session.execute(delete(MonthlyBalance))
+    closings = compute_monthly_closings(session)
+    if closings:
+        session.execute(
+            insert(MonthlyBalance),
+            [
+                {'scope': OVERALL_SCOPE, 'month': month, 'closing': closing}
+                for month, closing in closings.items()
+            ]
+        )
+    return summary
+
+
+def needs_rebuild(session):
+    """摘要列不存在，或已有資料卻沒有彙總/快照（舊版資料庫升級）"""
+    if get_summary(session) is None:
+        return True
+    if session.query(Expense.id).first() is not None \
+            and session.query(ExpenseRollup.month).first() is None:
+        return True
+    if session.query(MonthlyBalance.month).first() is not None:
+        return False
+    return any(session.query(model.id).first() is not None for model in LEDGER_MODELS)
+
+
+def verify(session):
+    """比對摘要列、彙總、月底快照與原始資料，回傳 {項目: (儲存值, 實際值)}（僅列出不一致者）"""
+    summary = get_summary(session)
+    totals = compute_totals(session)
+
+    drift = {}
+    for column, actual in totals.items():
+        stored = getattr(summary, column) if summary is not None else None
+        if stored != actual:
+            drift[column] = (stored, actual)
+
+    expense_groups = compute_expense_groups(session)
+    stored_groups = {
+        (row.category_id, row.month): (row.total, row.count)
+        for row in session.query(ExpenseRollup)
+        if row.total or row.count
+    }
+    for key in sorted(set(stored_groups) | set(expense_groups), key=lambda k: (k[1], str(k[0]))):
+        stored = stored_groups.get(key)
+        actual = expense_groups.get(key)
+        if stored != actual:
+            category_id, month = key
+            drift[f'expense_rollups[{category_id} {month:%Y-%m}]'] = (stored, actual)
+
+    stored_closings = {
+        row.month: row.closing
+        for row in session.query(MonthlyBalance).filter(MonthlyBalance.scope == OVERALL_SCOPE)
+    }
+    expected_closings = compute_monthly_closings(session)
+
+    # 沒有快照的月份沿用前一個月底值，兩邊都以「該月或之前最近的快照」比較
+    def effective(closings, month):
+        candidates = [m for m in closings if m <= month]
+        return closings[max(candidates)] if candidates else Decimal('0')
+
+    for month in sorted(set(stored_closings) | set(expected_closings)):
+        stored = effective(stored_closings, month)
+        actual = effective(expected_closings, month)
+        if stored != actual:
+            drift[f'monthly_balances[{month:%Y-%m}]'] = (stored, actual)
+
+    return drift
+
+
+def _next_month(month):
+    return (month + timedelta(days=32)).replace(day=1)
+
+
+def _month_end(month):
+    return _next_month(month) - timedelta(days=1)
+
+
+def split_range(date_start, date_end):
+    """將日期範圍拆成完整月份區間與頭尾不完整月份
+
+    回傳 ((第一個完整月, 最後一個完整月) 或 None, [(開始日, 結束日), ...])，
+    不完整的部分各自落在單一月份內。
+    """
+    start, end = _coerce_date(date_start), _coerce_date(date_end)
+    start_month, end_month = _month_of(start), _month_of(end)
+
+    if start_month == end_month:
+        if start == start_month and end == _month_end(end_month):
+            return (start_month, end_month), []
+        return None, [(start, end)]
+
+    partial = []
+    full_from = start_month
+    if start != start_month:
+        partial.append((start, _month_end(start_month)))
+        full_from = _next_month(start_month)
+
+    full_to = end_month
+    if end != _month_end(end_month):
+        partial.append((end_month, end))
+        full_to = _month_of(end_month - timedelta(days=1))
+
+    if full_from > full_to:
+        return None, partial
+    return (full_from, full_to), partial
+
+
+def _rollup_query(session, group_column, date_start, date_end):
+    """依範圍彙總：完整月份讀彙總表，頭尾不完整月份才掃描原始資料列
+
+    回傳 [(分組值, 金額, 筆數), ...]；group_column 為 'category_id' 或 'month'。
+    """
+    if date_start and date_end:
+        full, partial = split_range(date_start, date_end)
+    else:
+        full, partial = (None, None), []
+
+    results = []
+    if full is not None:
+        query = session.query(
+            getattr(ExpenseRollup, group_column),
+            func.sum(ExpenseRollup.total),
+            func.sum(ExpenseRollup.count)
+        )
+        if full[0] is not None:
+            query = query.filter(ExpenseRollup.month >= full[0], ExpenseRollup.month <= full[1])
+        results.extend(query.group_by(getattr(ExpenseRollup, group_column)).all())
+
+    for start, end in partial:
+        query = session.query(func.sum(Expense.amount), func.count(Expense.id)).filter(
+            Expense.date >= start, Expense.date <= end
+        )
+        if group_column == 'category_id':
+            rows = query.add_columns(Expense.category_id).group_by(Expense.category_id)
+            results.extend((category_id, total, count) for total, count, category_id in rows)
+        else:
+            total, count = query.one()
+            results.append((_month_of(start), total, count))
+
+    return results
+
+
+def category_totals(session, date_start=None, date_end=None):
+    """各類別支出加總 {category_id: 金額}（不含沒有支出的類別）"""
+    totals = defaultdict(Decimal)
+    counts = defaultdict(int)
+    for category_id, total, count in _rollup_query(session, 'category_id', date_start, date_end):
+        totals[category_id] += total or Decimal('0')
+        counts[category_id] += count or 0
+    return {category_id: totals[category_id] for category_id in totals if counts[category_id]}
+
+
+def monthly_expense_totals(session, date_start=None, date_end=None):
+    """每月支出總額 [(該月 1 日, 金額), ...]（依月份排序，不含沒有支出的月份）"""
+    totals = defaultdict(Decimal)
+    counts = defaultdict(int)
+    for month, total, count in _rollup_query(session, 'month', date_start, date_end):
+        totals[month] += total or Decimal('0')
+        counts[month] += count or 0
+    return sorted((month, totals[month]) for month in totals if counts[month])
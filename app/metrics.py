@@ -0,0 +1,114 @@
+"""Prometheus 指標：每個端點的延遲/回應大小/進行中請求 + SQL 語句次數與耗時
+
+gunicorn 多 worker 時以 multiprocess 模式彙總（PROMETHEUS_MULTIPROC_DIR，見 gunicorn.conf.py）：
+各 worker 把數值寫入共用目錄，任一 worker 回應 /metrics 時合併所有檔案。
+"""
+import os
+import time
+
+from flask import g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, REGISTRY,
+    generate_latest, multiprocess,
+)
+from sqlalchemy import event
+
+REQUEST_COUNT = Counter(
+    'http_requests_total', 'HTTP 請求數',
+    ['endpoint', 'method', 'status']
+)
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'HTTP 請求處理時間（串流回應算到送完為止）',
+    ['endpoint', 'method']
+)
+RESPONSE_SIZE = Histogram(
+    'http_response_size_bytes', 'HTTP 回應大小（串流回應不計）',
+    ['endpoint'],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+)
+IN_PROGRESS = Gauge(
+    'http_requests_in_progress', '處理中的 HTTP 請求數',
+    ['endpoint'],
+    multiprocess_mode='livesum'
+)
+SQL_COUNT = Counter(
+    'db_statements_total', 'SQL 語句數',
+    ['operation']
+)
+SQL_LATENCY = Histogram(
+    'db_statement_duration_seconds', 'SQL 語句執行時間',
+    ['operation'],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+)
+
+SQL_OPERATIONS = {'SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH'}
+
+
+def _endpoint():
+    # 未對應到路由（404 等）統一標為 unmatched，避免任意路徑造成標籤爆量
+    return request.endpoint or 'unmatched'
+
+
+def _before_request():
+    g._metrics_started = time.perf_counter()
+    g._metrics_endpoint = _endpoint()
+    IN_PROGRESS.labels(g._metrics_endpoint).inc()
+
+
+def _after_request(response):
+    started = g.pop('_metrics_started', None)
+    if started is None:
+        return response
+
+    endpoint = g.pop('_metrics_endpoint')
+    method = request.method
+    status = str(response.status_code)
+    size = response.content_length
+
+    def finish():
+        REQUEST_LATENCY.labels(endpoint, method).observe(time.perf_counter() - started)
+        REQUEST_COUNT.labels(endpoint, method, status).inc()
+        if size is not None:
+            RESPONSE_SIZE.labels(endpoint).observe(size)
+        IN_PROGRESS.labels(endpoint).dec()
+
+    # 回應送完（含串流匯出）才記錄
+    response.call_on_close(finish)
+    return response
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_metrics_started', None)
+    if started is None:
+        return
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ''
+    if operation not in SQL_OPERATIONS:
+        operation = 'OTHER'
+    SQL_COUNT.labels(operation).inc()
+    SQL_LATENCY.labels(operation).observe(time.perf_counter() - started)
+
+
+def instrument_engine(engine):
+    """在引擎上註冊 SQL 計時事件"""
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+def init_app(app):
+    """註冊請求計時 hook"""
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+
+
+def render():
+    """輸出 Prometheus 文字格式（multiprocess 模式時彙總所有 worker）"""
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), 200, {'Content-Type': CONTENT_TYPE_LATEST}
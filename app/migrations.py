@@ -0,0 +1,135 @@
+"""資料庫結構遷移：依版本順序執行，已套用的版本記錄於 schema_migrations
+
+create_all 只會建立不存在的資料表，既有資料表的索引/欄位變更需寫成遷移，
+由 `flask db upgrade` 執行。索引一律 CREATE INDEX CONCURRENTLY（不鎖寫入），
+因此 concurrent 遷移以 AUTOCOMMIT 連線逐句執行，無法包在交易內；
+中途失敗留下的 INVALID 索引會在重跑時先移除再重建。
+"""
+import re
+from collections import namedtuple
+
+from sqlalchemy import select, insert, text
+
+from app.models import SchemaMigration
+
+Migration = namedtuple('Migration', ['version', 'name', 'statements', 'concurrent'])
+
+# 同時只允許一個行程執行遷移
+LOCK_KEY = 'schema_migrations'
+
+_CONCURRENT_INDEX = re.compile(r'CREATE INDEX CONCURRENTLY IF NOT EXISTS (\w+)')
+
+
+def _index(name, table, definition):
+    return f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} {definition}'
+
+
+MIGRATIONS = [
+    Migration(1, 'trgm_search_indexes', [
+        'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+        # /search 與調整說明搜尋：ILIKE '%詞%' 與 %> 運算子
+        _index('ix_expenses_name_trgm', 'expenses', 'USING gin (name gin_trgm_ops)'),
+        _index('ix_adjustments_description_trgm', 'adjustments', 'USING gin (description gin_trgm_ops)'),
+    ], concurrent=True),
+
+    Migration(2, 'ledger_sort_indexes', [
+        # 列表游標分頁 ORDER BY date DESC, created_at DESC, id DESC（匯出為反向掃描），
+        # 以及期初餘額/彙總頭尾月份/走勢圖的日期區間 SUM(amount)
+        _index('ix_expenses_date_created_id', 'expenses',
+               '(date DESC, created_at DESC, id DESC) INCLUDE (amount)'),
+        _index('ix_repayments_date_created_id', 'repayments',
+               '(date DESC, created_at DESC, id DESC) INCLUDE (amount)'),
+        _index('ix_adjustments_date_created_id', 'adjustments',
+               '(date DESC, created_at DESC, id DESC) INCLUDE (amount)'),
+        # 支出列表依類別篩選（+ 日期區間）、類別期初餘額
+        _index('ix_expenses_category_date', 'expenses',
+               '(category_id, date DESC, created_at DESC, id DESC) INCLUDE (amount)'),
+    ], concurrent=True),
+
+    Migration(3, 'drop_superseded_indexes', [
+        # 已被上列複合索引涵蓋的單欄索引；名稱 btree 索引無法處理子字串搜尋，由 trigram 取代
+        'DROP INDEX CONCURRENTLY IF EXISTS ix_expenses_date',
+        'DROP INDEX CONCURRENTLY IF EXISTS ix_repayments_date',
+        'DROP INDEX CONCURRENTLY IF EXISTS ix_adjustments_date',
+        'DROP INDEX CONCURRENTLY IF EXISTS ix_expenses_category_id',
+        'DROP INDEX CONCURRENTLY IF EXISTS ix_expenses_name',
+    ], concurrent=True),
+
+    Migration(4, 'drop_category_closings', [
+        # 類別 scope 的月底快照沒有讀取端，每筆支出寫入卻要更新該月之後所有列，已停止維護
+        "DELETE FROM monthly_balances WHERE scope <> 'all'",
+    ], concurrent=False),
+]
+
+
+def applied_versions(connection):
+    """已套用的版本 {version: applied_at}"""
+    SchemaMigration.__table__.create(connection, checkfirst=True)
+    rows = connection.execute(select(SchemaMigration.version, SchemaMigration.applied_at))
+    return dict(rows.all())
+
+
+def pending(connection):
+    """尚未套用的遷移（依版本排序）"""
+    applied = applied_versions(connection)
+    return [migration for migration in MIGRATIONS if migration.version not in applied]
+
+
+def stamp(connection):
+    """將所有遷移標記為已套用（新資料庫由 create_all 直接建出最新結構時使用）"""
+    for migration in pending(connection):
+        connection.execute(insert(SchemaMigration).values(
+            version=migration.version, name=migration.name
+        ))
+
+
+def _drop_invalid_indexes(connection, statement):
+    """移除先前 CONCURRENTLY 失敗留下的 INVALID 索引（IF NOT EXISTS 會略過它們）"""
+    match = _CONCURRENT_INDEX.search(statement)
+    if not match:
+        return
+    invalid = connection.execute(text(
+        'SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid '
+        'WHERE c.relname = :name AND NOT i.indisvalid'
+    ), {'name': match.group(1)}).first()
+    if invalid:
+        connection.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS {match.group(1)}'))
+
+
+def _apply(engine, migration):
+    if migration.concurrent:
+        with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+            for statement in migration.statements:
+                _drop_invalid_indexes(connection, statement)
+                connection.execute(text(statement))
+            connection.execute(insert(SchemaMigration).values(
+                version=migration.version, name=migration.name
+            ))
+    else:
+        with engine.begin() as connection:
+            for statement in migration.statements:
+                connection.execute(text(statement))
+            connection.execute(insert(SchemaMigration).values(
+                version=migration.version, name=migration.name
+            ))
+
+
+def upgrade(engine, target=None, echo=print):
+    """依序套用待執行的遷移（target 指定時只套用到該版本），回傳套用數"""
+    if engine.dialect.name != 'postgresql':
+        raise RuntimeError('資料庫遷移僅支援 PostgreSQL')
+
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as lock:
+        lock.execute(text('SELECT pg_advisory_lock(hashtext(:key))'), {'key': LOCK_KEY})
+        try:
+            todo = [
+                migration for migration in pending(lock)
+                if target is None or migration.version <= target
+            ]
+            for migration in todo:
+                echo(f"⏳ {migration.version:04d} {migration.name}")
+                _apply(engine, migration)
+                echo(f"✅ {migration.version:04d} {migration.name}")
+            return len(todo)
+        finally:
+            lock.execute(text('SELECT pg_advisory_unlock(hashtext(:key))'), {'key': LOCK_KEY})
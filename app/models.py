@@ -3,7 +3,7 @@ from decimal import Decimal
 from uuid import uuid4
 import enum
 
-from sqlalchemy import Column, String, Numeric, Date, Boolean, ForeignKey, Enum
+from sqlalchemy import Column, String, Numeric, Date, DateTime, Boolean, ForeignKey, Enum, Integer, BigInteger, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship, declarative_base
 from sqlalchemy.sql import func
@@ -46,16 +46,29 @@ class Expense(Base):
     __tablename__ = 'expenses'
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid4)
-    category_id = Column(UUID(as_uuid=True), ForeignKey('categories.id'), nullable=False, index=True)
-    name = Column(String(200), nullable=False, index=True)  # 支出名稱
+    category_id = Column(UUID(as_uuid=True), ForeignKey('categories.id'), nullable=False)
+    name = Column(String(200), nullable=False)  # 支出名稱
     amount = Column(Numeric(10, 2), nullable=False)
-    date = Column(Date, nullable=False, default=taipei_today, index=True)
+    date = Column(Date, nullable=False, default=taipei_today)
     reviewed = Column(Boolean, nullable=False, default=False, index=True)  # 審核狀態
     created_at = Column(Date, nullable=False, default=taipei_today)
     updated_at = Column(Date, nullable=False, default=taipei_today, onupdate=taipei_today)
 
     category = relationship('Category', back_populates='expenses')
 
+    # 索引與 app/migrations.py 一致（新資料庫由 create_all 建立，既有資料庫由 flask db upgrade 補建）
+    __table_args__ = (
+        # 列表排序（日期新→舊）與日期區間加總，INCLUDE amount 可只讀索引
+        Index('ix_expenses_date_created_id', date.desc(), created_at.desc(), id.desc(),
+              postgresql_include=['amount']),
+        # 類別篩選 + 日期區間 + 同樣排序
+        Index('ix_expenses_category_date', category_id, date.desc(), created_at.desc(), id.desc(),
+              postgresql_include=['amount']),
+        # 名稱子字串搜尋（ILIKE / word_similarity）用的 trigram 索引，需 pg_trgm
+        Index('ix_expenses_name_trgm', 'name',
+              postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}),
+    )
+
     def __repr__(self):
         return f"<Expense {self.name} ${self.amount}>"
 
@@ -65,10 +78,15 @@ class Repayment(Base):
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid4)
     amount = Column(Numeric(10, 2), nullable=False)
-    date = Column(Date, nullable=False, default=taipei_today, index=True)
+    date = Column(Date, nullable=False, default=taipei_today)
     created_at = Column(Date, nullable=False, default=taipei_today)
     updated_at = Column(Date, nullable=False, default=taipei_today, onupdate=taipei_today)
 
+    __table_args__ = (
+        Index('ix_repayments_date_created_id', date.desc(), created_at.desc(), id.desc(),
+              postgresql_include=['amount']),
+    )
+
     def __repr__(self):
         return f"<Repayment ${self.amount}>"
 
@@ -79,9 +97,85 @@ class Adjustment(Base):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid4)
     amount = Column(Numeric(10, 2), nullable=False)
     description = Column(String(200), nullable=False)
-    date = Column(Date, nullable=False, default=taipei_today, index=True)
+    date = Column(Date, nullable=False, default=taipei_today)
     created_at = Column(Date, nullable=False, default=taipei_today)
     updated_at = Column(Date, nullable=False, default=taipei_today, onupdate=taipei_today)
 
+    __table_args__ = (
+        Index('ix_adjustments_date_created_id', date.desc(), created_at.desc(), id.desc(),
+              postgresql_include=['amount']),
+        # 說明子字串搜尋用的 trigram 索引，需 pg_trgm
+        Index('ix_adjustments_description_trgm', 'description',
+              postgresql_using='gin', postgresql_ops={'description': 'gin_trgm_ops'}),
+    )
+
     def __repr__(self):
         return f"<Adjustment {self.description} ${self.amount}>"
+
+
+class LedgerSummary(Base):
+    """全期總額摘要（單列，由寫入路徑在同一交易內遞增維護）"""
+    __tablename__ = 'ledger_summary'
+
+    id = Column(Integer, primary_key=True, default=1)
+    total_expenses = Column(Numeric(14, 2), nullable=False, default=Decimal('0'))
+    total_repayments = Column(Numeric(14, 2), nullable=False, default=Decimal('0'))
+    total_adjustments = Column(Numeric(14, 2), nullable=False, default=Decimal('0'))
+    updated_at = Column(Date, nullable=False, default=taipei_today, onupdate=taipei_today)
+
+    @property
+    def balance(self):
+        """總額 = Σ支出 - Σ還款 + Σ調整"""
+        return self.total_expenses - self.total_repayments + self.total_adjustments
+
+    def __repr__(self):
+        return f"<LedgerSummary ${self.balance}>"
+
+
+class MonthlyBalance(Base):
+    """每月月底累積餘額快照（scope 固定為 'all' = 總額）"""
+    __tablename__ = 'monthly_balances'
+
+    month = Column(Date, primary_key=True)  # 該月 1 日
+    scope = Column(String(36), primary_key=True)
+    closing = Column(Numeric(14, 2), nullable=False, default=Decimal('0'))
+
+    def __repr__(self):
+        return f"<MonthlyBalance {self.month:%Y-%m} {self.scope} ${self.closing}>"
+
+
+class DataStamp(Base):
+    """各資料表的資料版本戳記（每次寫入遞增，所有 worker 共用，用於快取失效）"""
+    __tablename__ = 'data_stamps'
+
+    table_name = Column(String(50), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    def __repr__(self):
+        return f"<DataStamp {self.table_name} v{self.version}>"
+
+
+class ExpenseRollup(Base):
+    """類別 × 月份支出彙總（由寫入路徑遞增維護，供圓餅圖/長條圖/摘要卡使用）"""
+    __tablename__ = 'expense_rollups'
+
+    category_id = Column(UUID(as_uuid=True), ForeignKey('categories.id'), primary_key=True)
+    month = Column(Date, primary_key=True)  # 該月 1 日
+    total = Column(Numeric(14, 2), nullable=False, default=Decimal('0'))
+    count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<ExpenseRollup {self.month:%Y-%m} ${self.total} ({self.count})>"
+
+
+class SchemaMigration(Base):
+    """已套用的資料庫遷移版本（見 app/migrations.py）"""
+    __tablename__ = 'schema_migrations'
+
+    version = Column(Integer, primary_key=True)
+    name = Column(String(100), nullable=False)
+    applied_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    def __repr__(self):
+        return f"<SchemaMigration {self.version:04d} {self.name}>"
@@ -0,0 +1,148 @@
+"""列表分頁：游標（keyset）分頁 + 舊版 ?page= 位移分頁"""
+import base64
+import binascii
+import json
+from datetime import date as date_type
+from uuid import UUID
+
+from sqlalchemy import tuple_
+
+PER_PAGE = 50
+
+
+class Page:
+    """一頁資料與導覽資訊（供 _pagination.html 使用）"""
+
+    def __init__(self, items, page, total=None, per_page=PER_PAGE,
+                 next_cursor=None, prev_cursor=None, mode='cursor', cursor=None):
+        self.items = items
+        self.page = page
+        self.total = total
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.mode = mode
+        self.cursor = cursor
+
+    @property
+    def total_pages(self):
+        if self.total is None:
+            return None
+        return (self.total + self.per_page - 1) // self.per_page  # 無條件進位
+
+    @property
+    def has_next(self):
+        if self.mode == 'offset':
+            return self.page < (self.total_pages or 0)
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        if self.mode == 'offset':
+            return self.page > 1
+        return self.prev_cursor is not None
+
+    @property
+    def has_first(self):
+        """是否顯示「首頁」連結（游標分頁只要帶了游標就顯示，游標過期/超出範圍的空白頁也能回到開頭）"""
+        if self.mode == 'offset':
+            return self.page > 1
+        return self.cursor is not None
+
+
+def sort_keys(model):
+    """穩定排序鍵：日期新→舊，同日依建立日，再以 id 決勝"""
+    return (model.date, model.created_at, model.id)
+
+
+def encode_cursor(direction, row, page, total):
+    """將排序鍵值編成不透明的游標字串"""
+    payload = {
+        'd': direction,
+        'k': [row.date.isoformat(), row.created_at.isoformat(), str(row.id)],
+        'p': page,
+        't': total,
+    }
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """解析游標；格式錯誤時回傳 None（視為第一頁）"""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        payload = json.loads(raw)
+        day, created, row_id = payload['k']
+        return {
+            'direction': 'prev' if payload['d'] == 'prev' else 'next',
+            'keys': (date_type.fromisoformat(day), date_type.fromisoformat(created), UUID(row_id)),
+            'page': max(int(payload.get('p') or 1), 1),
+            'total': payload.get('t'),
+        }
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        return None
+
+
+def keyset_page(query, model, cursor=None, per_page=PER_PAGE, with_total=True):
+    """游標分頁：以 (date, created_at, id) 比較定位，不受頁數深淺影響
+
+    總筆數只在第一頁計算一次，之後隨游標傳遞，不再每頁 COUNT(*)。
+    """
+    keys = sort_keys(model)
+    state = decode_cursor(cursor)
+
+    if state is None:
+        total = query.order_by(None).count() if with_total else None
+        rows = query.order_by(*[k.desc() for k in keys]).limit(per_page + 1).all()
+        has_more = len(rows) > per_page
+        items = rows[:per_page]
+        page = 1
+        prev_cursor = None
+        next_cursor = encode_cursor('next', items[-1], page + 1, total) if has_more else None
+        return Page(items, page, total, per_page, next_cursor, prev_cursor)
+
+    total = state['total']
+    if state['direction'] == 'next':
+        rows = (query.filter(tuple_(*keys) < state['keys'])
+                .order_by(*[k.desc() for k in keys])
+                .limit(per_page + 1).all())
+        has_more = len(rows) > per_page
+        items = rows[:per_page]
+        page = state['page']
+        next_cursor = encode_cursor('next', items[-1], page + 1, total) if has_more else None
+        prev_cursor = encode_cursor('prev', items[0], page - 1, total) if items else None
+    else:
+        # 往前翻：反向排序取下一批，再轉回新→舊
+        rows = (query.filter(tuple_(*keys) > state['keys'])
+                .order_by(*[k.asc() for k in keys])
+                .limit(per_page + 1).all())
+        has_more = len(rows) > per_page
+        items = list(reversed(rows[:per_page]))
+        page = state['page']
+        next_cursor = encode_cursor('next', items[-1], page + 1, total) if items else None
+        prev_cursor = encode_cursor('prev', items[0], page - 1, total) if has_more else None
+
+    return Page(items, page, total, per_page, next_cursor, prev_cursor, cursor=cursor)
+
+
+def offset_page(query, model, page, per_page=PER_PAGE):
+    """舊版 ?page= 連結：LIMIT/OFFSET 分頁（保留相容）"""
+    page = max(page, 1)
+    total = query.order_by(None).count()
+    items = (query.order_by(*[k.desc() for k in sort_keys(model)])
+             .limit(per_page).offset((page - 1) * per_page).all())
+    return Page(items, page, total, per_page, mode='offset')
+
+
+def paginate(query, model, args, per_page=PER_PAGE):
+    """依請求參數選擇分頁模式：有 ?page= 且無游標時沿用位移分頁"""
+    cursor = args.get('cursor')
+    page = args.get('page')
+    if page and not cursor:
+        try:
+            return offset_page(query, model, int(page), per_page)
+        except ValueError:
+            pass
+    return keyset_page(query, model, cursor, per_page)
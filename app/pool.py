@@ -0,0 +1,143 @@
+"""資料庫連線池設定（環境變數）與連線池統計
+
+兩種模式：
+- queue（預設）：每個 worker 一個 QueuePool，可設定大小/溢出/回收/逾時，
+  並記錄取得連線的等待時間。
+- pooler：前面有外部交易池（PgBouncer transaction mode、Supabase pooler 等），
+  由外部池管理連線，app 端用 NullPool，不保留任何 session 層級狀態。
+"""
+import os
+import threading
+import time
+
+from sqlalchemy import exc, text
+from sqlalchemy.pool import NullPool, QueuePool
+
+# 取得連線超過此毫秒數才算「有等待」
+WAIT_THRESHOLD_MS = 1.0
+
+
+def _env_int(name, default):
+    return int(os.getenv(name, default))
+
+
+def _env_flag(name, default='0'):
+    return os.getenv(name, default).lower() in ('1', 'true', 'yes', 'on')
+
+
+def pool_mode():
+    """'queue' 或 'pooler'（DB_POOL_MODE）"""
+    return os.getenv('DB_POOL_MODE', 'queue').lower()
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool + 取得連線等待時間統計（不含建立新連線本身的時間）"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self._local = threading.local()
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_total_ms = 0.0
+        self.wait_max_ms = 0.0
+        self.timeouts = 0
+        self.connects = 0
+        self.connect_total_ms = 0.0
+
+    def _create_connection(self):
+        started = time.perf_counter()
+        try:
+            return super()._create_connection()
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            self._local.connect_ms = getattr(self._local, 'connect_ms', 0.0) + elapsed
+            with self._stats_lock:
+                self.connects += 1
+                self.connect_total_ms += elapsed
+
+    def _do_get(self):
+        self._local.connect_ms = 0.0
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            waited = (time.perf_counter() - started) * 1000 - self._local.connect_ms
+            with self._stats_lock:
+                self.checkouts += 1
+                if waited >= WAIT_THRESHOLD_MS:
+                    self.waits += 1
+                    self.wait_total_ms += waited
+                    self.wait_max_ms = max(self.wait_max_ms, waited)
+
+
+def engine_options():
+    """create_engine 參數（由 DB_POOL_* 環境變數決定）"""
+    if pool_mode() == 'pooler':
+        # 外部交易池：每次借用都向外部池取連線，歸還即釋放；不 pre-ping（外部池自己處理斷線）。
+        # app 不使用 SET / LISTEN / 暫存表等 session 狀態，psycopg2 也不用 prepared statement
+        return {'poolclass': NullPool, 'pool_pre_ping': False}
+
+    return {
+        'poolclass': TimedQueuePool,
+        'pool_size': _env_int('DB_POOL_SIZE', 5),
+        'max_overflow': _env_int('DB_MAX_OVERFLOW', 10),
+        'pool_timeout': _env_int('DB_POOL_TIMEOUT', 30),
+        # 定期回收，取代每次借用都 ping（少一次往返）
+        'pool_recycle': _env_int('DB_POOL_RECYCLE', 1800),
+        'pool_pre_ping': _env_flag('DB_POOL_PRE_PING'),
+        'pool_use_lifo': True,
+    }
+
+
+def warm_up(engine, count=None):
+    """預先建立 count 條連線放回池中（gunicorn post_fork 呼叫，DB_POOL_WARMUP）"""
+    if count is None:
+        count = _env_int('DB_POOL_WARMUP', 0)
+    if count <= 0 or not isinstance(engine.pool, QueuePool):
+        return 0
+
+    connections = []
+    try:
+        for _ in range(min(count, engine.pool.size())):
+            connection = engine.connect()
+            connection.execute(text('SELECT 1'))
+            connections.append(connection)
+    finally:
+        for connection in connections:
+            connection.close()
+    return len(connections)
+
+
+def pool_stats(engine):
+    """本 worker 的連線池狀態"""
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return {'mode': pool_mode(), 'pool': type(pool).__name__}
+
+    stats = {
+        'mode': pool_mode(),
+        'pool': type(pool).__name__,
+        'size': pool.size(),
+        'checked_in': pool.checkedin(),
+        'checked_out': pool.checkedout(),
+        'overflow': pool.overflow(),
+        'timeout': pool.timeout(),
+    }
+    if isinstance(pool, TimedQueuePool):
+        with pool._stats_lock:
+            stats.update({
+                'checkouts': pool.checkouts,
+                'waits': pool.waits,
+                'wait_total_ms': round(pool.wait_total_ms, 2),
+                'wait_avg_ms': round(pool.wait_total_ms / pool.waits, 2) if pool.waits else 0.0,
+                'wait_max_ms': round(pool.wait_max_ms, 2),
+                'timeouts': pool.timeouts,
+                'connects': pool.connects,
+                'connect_avg_ms': round(pool.connect_total_ms / pool.connects, 2) if pool.connects else 0.0,
+            })
+    return stats
@@ -0,0 +1,133 @@
+"""逐請求 SQL 分析：記錄每條語句與耗時，找出 N+1 與慢查詢
+
+啟用方式（預設關閉）：
+- 設定 SQL_PROFILE=1：所有請求都分析
+- 請求帶 X-SQL-Profile: 1 標頭：只分析該請求
+
+分析中的請求會回傳 X-SQL-Profile / Server-Timing 摘要標頭，並在回應送完後寫一行日誌；
+同一語句重複執行達 SQL_NPLUS1_THRESHOLD 次視為 N+1，超過 SQL_SLOW_MS 的語句記為慢查詢。
+關閉時引擎事件只讀一次 ContextVar 就返回。
+"""
+import os
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+
+from flask import current_app, request
+from sqlalchemy import event
+
+HEADER = 'X-SQL-Profile'
+
+_current = ContextVar('sql_profile', default=None)
+
+
+class QueryProfile:
+    """單一請求的 SQL 紀錄"""
+
+    def __init__(self):
+        self.statements = []  # [(statement, 毫秒, executemany)]
+
+    def record(self, statement, duration_ms, executemany):
+        self.statements.append((statement, duration_ms, executemany))
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    @property
+    def total_ms(self):
+        return sum(duration for _, duration, _ in self.statements)
+
+    def repeated(self, threshold):
+        """重複執行 threshold 次以上的相同語句 [(statement, 次數, 總毫秒)]，依次數排序"""
+        groups = defaultdict(lambda: [0, 0.0])
+        for statement, duration, _ in self.statements:
+            groups[statement][0] += 1
+            groups[statement][1] += duration
+        return sorted(
+            ((statement, count, total) for statement, (count, total) in groups.items() if count >= threshold),
+            key=lambda item: item[1],
+            reverse=True
+        )
+
+    def slow(self, threshold_ms):
+        """超過 threshold_ms 的語句 [(statement, 毫秒)]"""
+        return [(statement, duration) for statement, duration, _ in self.statements if duration >= threshold_ms]
+
+
+def _shorten(statement, limit=200):
+    statement = ' '.join(statement.split())
+    return statement if len(statement) <= limit else statement[:limit] + '…'
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        context._profile_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current.get()
+    started = getattr(context, '_profile_started', None)
+    if profile is not None and started is not None:
+        profile.record(statement, (time.perf_counter() - started) * 1000, executemany)
+
+
+def instrument_engine(engine):
+    """在引擎上註冊 SQL 紀錄事件"""
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+def _enabled():
+    return current_app.config['SQL_PROFILE'] or request.headers.get(HEADER) == '1'
+
+
+def _before_request():
+    _current.set(QueryProfile() if _enabled() else None)
+
+
+def _after_request(response):
+    profile = _current.get()
+    if profile is None:
+        return response
+
+    config = current_app.config
+    repeated = profile.repeated(config['SQL_NPLUS1_THRESHOLD'])
+    slow = profile.slow(config['SQL_SLOW_MS'])
+
+    # 串流回應（匯出）送出標頭時尚未執行完所有語句，完整數字見日誌
+    response.headers[HEADER] = (
+        f"queries={profile.count}; time={profile.total_ms:.1f}ms; "
+        f"repeated={len(repeated)}; slow={len(slow)}"
+    )
+    response.headers.add('Server-Timing', f'db;dur={profile.total_ms:.1f};desc="{profile.count} queries"')
+
+    logger = current_app.logger
+    endpoint = request.endpoint or request.path
+    method = request.method
+
+    def finish():
+        _current.set(None)
+        repeated = profile.repeated(config['SQL_NPLUS1_THRESHOLD'])
+        slow = profile.slow(config['SQL_SLOW_MS'])
+        logger.info(
+            "SQL 分析 %s %s：%d 條語句，%.1f ms，重複 %d 組，慢查詢 %d 條",
+            method, endpoint, profile.count, profile.total_ms, len(repeated), len(slow)
+        )
+        for statement, count, total in repeated:
+            logger.warning("疑似 N+1 %s：同一語句執行 %d 次（共 %.1f ms）：%s",
+                           endpoint, count, total, _shorten(statement))
+        for statement, duration in slow:
+            logger.warning("慢查詢 %s：%.1f ms：%s", endpoint, duration, _shorten(statement))
+
+    response.call_on_close(finish)
+    return response
+
+
+def init_app(app):
+    """讀取設定並註冊請求 hook"""
+    app.config.setdefault('SQL_PROFILE', os.getenv('SQL_PROFILE', '0').lower() in ('1', 'true', 'yes', 'on'))
+    app.config.setdefault('SQL_SLOW_MS', float(os.getenv('SQL_SLOW_MS', '100')))
+    app.config.setdefault('SQL_NPLUS1_THRESHOLD', int(os.getenv('SQL_NPLUS1_THRESHOLD', '5')))
+    app.before_request(_before_request)
+    app.after_request(_after_request)
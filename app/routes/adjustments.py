@@ -3,7 +3,11 @@ from datetime import timedelta
 from decimal import Decimal
 
 from app.database import Session
+from app.pagination import paginate
+from app import htmx
+from app.conditional import conditional
 from app.models import Adjustment, taipei_today
+from app.search import contains
 
 bp = Blueprint('adjustments', __name__, url_prefix='/adjustments')
 
@@ -30,6 +34,7 @@ def get_date_range(preset):
 
 
 @bp.route('/')
+@conditional(['adjustments'])
 def index():
     """調整項目流水頁"""
     db = Session()
@@ -42,7 +47,6 @@ def index():
         search = request.args.get('search', '').strip()
         min_amount = request.args.get('min_amount')
         max_amount = request.args.get('max_amount')
-        page = int(request.args.get('page', 1))
 
         # 建立查詢
         query = db.query(Adjustment)
@@ -58,9 +62,9 @@ def index():
             if end_date:
                 query = query.filter(Adjustment.date <= end_date)
 
-        # 說明搜尋
+        # 說明搜尋（由 trigram 索引處理，不需掃全表）
         if search:
-            query = query.filter(Adjustment.description.ilike(f'%{search}%'))
+            query = query.filter(contains(Adjustment.description, search))
 
         # 金額範圍
         if min_amount:
@@ -68,21 +72,13 @@ def index():
         if max_amount:
             query = query.filter(Adjustment.amount <= Decimal(max_amount))
 
-        # 排序：日期新→舊
-        query = query.order_by(Adjustment.date.desc(), Adjustment.created_at.desc())
-
-        # 分頁（每頁 50 筆）
-        per_page = 50
-        total = query.count()
-        total_pages = (total + per_page - 1) // per_page
-        adjustments = query.limit(per_page).offset((page - 1) * per_page).all()
+        # 分頁（每頁 50 筆）：日期新→舊，游標分頁；舊版 ?page= 連結仍可用
+        pager = paginate(query, Adjustment, request.args)
 
         return render_template(
             'adjustments.html',
-            adjustments=adjustments,
-            page=page,
-            total_pages=total_pages,
-            total=total,
+            adjustments=pager.items,
+            pager=pager,
             filters={
                 'preset': preset,
                 'start_date': start_date,
@@ -96,6 +92,23 @@ def index():
         db.close()
 
 
+@bp.route('/<uuid:adjustment_id>/row')
+def row(adjustment_id):
+    """單列（HTMX 行內編輯取消時還原）"""
+    if not htmx.is_htmx():
+        return redirect(url_for('adjustments.index'))
+
+    db = Session()
+
+    try:
+        adjustment = db.query(Adjustment).filter(Adjustment.id == adjustment_id).first()
+        if not adjustment:
+            abort(404)
+        return htmx.fragment(htmx.render_macro('_rows.html', 'adjustment_row', adjustment))
+    finally:
+        db.close()
+
+
 @bp.route('/<uuid:adjustment_id>/edit', methods=['GET', 'POST'])
 def edit(adjustment_id):
     """編輯調整項目"""
@@ -112,14 +125,20 @@ def edit(adjustment_id):
             adjustment.date = request.form.get('date') or taipei_today()
 
             db.commit()
+            if htmx.is_htmx():
+                return htmx.fragment(htmx.render_macro('_rows.html', 'adjustment_row', adjustment), message='✅ 調整項目已更新')
             flash('✅ 調整項目已更新', 'success')
             return redirect(url_for('adjustments.index'))
 
-        # GET: 顯示編輯表單
+        # GET: 顯示編輯表單（HTMX：把該列換成行內編輯列）
+        if htmx.is_htmx():
+            return htmx.fragment(htmx.render_macro('_rows.html', 'adjustment_edit_row', adjustment))
         return render_template('adjustment_edit.html', adjustment=adjustment)
 
     except Exception as e:
         db.rollback()
+        if htmx.is_htmx():
+            return htmx.message(f'❌ 更新失敗: {str(e)}')
         flash(f'❌ 更新失敗: {str(e)}', 'error')
         return redirect(url_for('adjustments.index'))
     finally:
@@ -138,11 +157,15 @@ def delete(adjustment_id):
         db.delete(adjustment)
         db.commit()
 
+        if htmx.is_htmx():
+            return htmx.fragment(message='✅ 調整項目已刪除')
         flash('✅ 調整項目已刪除', 'success')
         return redirect(url_for('adjustments.index'))
 
     except Exception as e:
         db.rollback()
+        if htmx.is_htmx():
+            return htmx.message(f'❌ 刪除失敗: {str(e)}')
         flash(f'❌ 刪除失敗: {str(e)}', 'error')
         return redirect(url_for('adjustments.index'))
     finally:
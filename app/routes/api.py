@@ -0,0 +1,120 @@
+from flask import Blueprint, request, jsonify
+from uuid import UUID
+
+from app.database import Session
+from app.catalog import catalog
+from app import importer
+
+bp = Blueprint('api', __name__, url_prefix='/api')
+
+# 單次請求最多筆數
+MAX_BATCH_ITEMS = 5000
+
+
+def parse_expense_item(db, item):
+    """JSON 支出：category_id 或 category（類別名稱）擇一"""
+    category_id = item.get('category_id')
+    if category_id:
+        try:
+            info = catalog.get(db, UUID(str(category_id)))
+        except ValueError:
+            info = None
+        if info is None:
+            raise importer.RowError(f"類別不存在: {category_id}")
+        category = info.name.value
+    else:
+        category = _string(item, 'category', '類別')
+
+    return importer.parse_expense(
+        db, _string(item, 'date', '日期'), category, _string(item, 'name', '名稱'), _amount(item)
+    )
+
+
+def parse_repayment_item(db, item):
+    return importer.parse_repayment(db, _string(item, 'date', '日期'), _amount(item))
+
+
+def parse_adjustment_item(db, item):
+    return importer.parse_adjustment(
+        db, _string(item, 'date', '日期'), _string(item, 'description', '說明'), _amount(item)
+    )
+
+
+def _string(item, key, field):
+    """文字欄位必須是 JSON 字串（importer 的解析函式只接受 str / None）"""
+    value = item.get(key)
+    if value is not None and not isinstance(value, str):
+        raise importer.RowError(f"{field}必須是字串")
+    return value
+
+
+def _amount(item):
+    """金額可為 JSON 數字或字串；數字轉字串交給 Decimal 解析（避免 float 誤差）"""
+    value = item.get('amount')
+    if value is None:
+        return ''
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        raise importer.RowError("金額必須是數字或字串")
+    return str(value)
+
+
+PARSERS = {
+    'expenses': parse_expense_item,
+    'repayments': parse_repayment_item,
+    'adjustments': parse_adjustment_item,
+}
+
+
+@bp.route('/batch', methods=['POST'])
+def batch():
+    """批次新增支出/還款/調整（單一交易，每表一次多列 INSERT）
+
+    請求：{"expenses": [...], "repayments": [...], "adjustments": [...]}
+    回應：各項目依原順序回傳 {"id": ...} 或 {"error": ...}
+    """
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify({'error': '請求內容必須是 JSON 物件'}), 400
+
+    items = {table: payload.get(table) or [] for table in PARSERS}
+    if any(not isinstance(value, list) for value in items.values()):
+        return jsonify({'error': 'expenses / repayments / adjustments 必須是陣列'}), 400
+    if sum(len(value) for value in items.values()) > MAX_BATCH_ITEMS:
+        return jsonify({'error': f'單次最多 {MAX_BATCH_ITEMS} 筆'}), 400
+
+    db = Session()
+
+    try:
+        results = {table: [] for table in PARSERS}
+        valid = {table: [] for table in PARSERS}
+
+        for table, parse in PARSERS.items():
+            for index, item in enumerate(items[table]):
+                try:
+                    if not isinstance(item, dict):
+                        raise importer.RowError('項目必須是 JSON 物件')
+                    _, values = parse(db, item)
+                except importer.RowError as e:
+                    results[table].append({'index': index, 'error': str(e)})
+                    continue
+                valid[table].append((index, values))
+
+        inserted = 0
+        for table, entries in valid.items():
+            ids = importer.insert_rows(db, table, [values for _, values in entries])
+            for (index, _), row_id in zip(entries, ids, strict=True):
+                results[table].append({'index': index, 'id': str(row_id)})
+            inserted += len(ids)
+        db.commit()
+
+        for table in results:
+            results[table].sort(key=lambda result: result['index'])
+
+        errors = sum(1 for rows in results.values() for row in rows if 'error' in row)
+        return jsonify({'inserted': inserted, 'errors': errors, **results}), 200
+
+    except Exception as e:
+        db.rollback()
+        return jsonify({'error': f'新增失敗: {str(e)}'}), 500
+    finally:
+        db.close()
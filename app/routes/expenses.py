@@ -1,10 +1,15 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, abort
-from sqlalchemy import or_
-from datetime import datetime, timedelta
+from flask import Blueprint, render_template, request, redirect, url_for, flash, abort, jsonify
+from sqlalchemy import update, delete as sql_delete
+from datetime import date, timedelta
 from decimal import Decimal
+from uuid import UUID
 
 from app.database import Session
-from app.models import Category, Expense, CategoryEnum, taipei_today
+from app.pagination import paginate, keyset_page
+from app.conditional import conditional
+from app.models import Expense, CategoryEnum, taipei_today
+from app.catalog import catalog
+from app import ledger, cache, htmx
 import pytz
 
 bp = Blueprint('expenses', __name__, url_prefix='/expenses')
@@ -41,61 +46,79 @@ def get_date_range(preset):
     return None, None
 
 
+# 列表篩選參數（批次操作、無限捲動沿用）
+FILTER_FIELDS = ('category_id', 'category_name', 'preset', 'year', 'month')
+
+
+def filter_criteria(db, args):
+    """依篩選參數（類別、預設區間、自訂年月）產生查詢條件，列表與批次操作共用"""
+    category_id = args.get('category_id')
+    category_name = args.get('category_name')
+    preset = args.get('preset', '')
+    year = args.get('year')
+    month = args.get('month')
+
+    criteria = []
+
+    # 類別篩選（類別名稱經目錄轉為 category_id，不需 join categories）
+    if category_id:
+        criteria.append(Expense.category_id == category_id)
+    elif category_name:
+        criteria.append(Expense.category_id == catalog.id_for(db, CategoryEnum(category_name)))
+
+    # 日期篩選：自訂月份優先
+    date_start, date_end = None, None
+    if year and month:
+        try:
+            y, m = int(year), int(month)
+            date_start = date(y, m, 1)
+            # 計算該月最後一天
+            if m == 12:
+                date_end = date(y, 12, 31)
+            else:
+                date_end = date(y, m + 1, 1) - timedelta(days=1)
+        except (ValueError, TypeError):
+            pass
+    elif preset:
+        date_start, date_end = get_date_range(preset)
+
+    if date_start and date_end:
+        criteria.append(Expense.date >= date_start)
+        criteria.append(Expense.date <= date_end)
+
+    return criteria
+
+
+def _next_rows_url(pager, args):
+    """下一批列的網址（游標分頁且還有下一批時）"""
+    if pager.mode != 'cursor' or not pager.has_next:
+        return None
+    filters = {field: args.get(field) for field in FILTER_FIELDS if args.get(field)}
+    return url_for('expenses.rows', cursor=pager.next_cursor, **filters)
+
+
 @bp.route('/')
+@conditional(['expenses', 'categories'])
 def index():
     """支出流水頁"""
     db = Session()
 
     try:
-        from datetime import date
-
         # 篩選參數
         category_id = request.args.get('category_id')
         category_name = request.args.get('category_name')
         preset = request.args.get('preset', '')
         year = request.args.get('year')
         month = request.args.get('month')
-        page = int(request.args.get('page', 1))
 
         # 建立查詢
-        query = db.query(Expense).join(Category)
+        query = db.query(Expense).filter(*filter_criteria(db, request.args))
 
-        # 類別篩選
-        if category_id:
-            query = query.filter(Expense.category_id == category_id)
-        elif category_name:
-            query = query.filter(Category.name == CategoryEnum(category_name))
-
-        # 日期篩選：自訂月份優先
-        date_start, date_end = None, None
-        if year and month:
-            try:
-                y, m = int(year), int(month)
-                date_start = date(y, m, 1)
-                # 計算該月最後一天
-                if m == 12:
-                    date_end = date(y, 12, 31)
-                else:
-                    date_end = date(y, m + 1, 1) - timedelta(days=1)
-            except (ValueError, TypeError):
-                pass
-        elif preset:
-            date_start, date_end = get_date_range(preset)
+        # 分頁（每頁 50 筆）：日期新→舊，游標分頁；舊版 ?page= 連結仍可用
+        pager = paginate(query, Expense, request.args)
 
-        if date_start and date_end:
-            query = query.filter(Expense.date >= date_start, Expense.date <= date_end)
-
-        # 排序：日期新→舊
-        query = query.order_by(Expense.date.desc(), Expense.created_at.desc())
-
-        # 分頁（每頁 50 筆）
-        per_page = 50
-        total = query.count()
-        total_pages = (total + per_page - 1) // per_page  # 無條件進位
-        expenses = query.limit(per_page).offset((page - 1) * per_page).all()
-
-        # 取得所有啟用的類別（用於按鈕導覽）
-        categories = db.query(Category).filter(Category.active == True).all()
+        # 取得所有啟用的類別（用於按鈕導覽，來自行程內目錄）
+        categories = catalog.active(db)
 
         # 計算顯示變數
         today = taipei_today()
@@ -123,15 +146,15 @@ def index():
 
         return render_template(
             'expenses.html',
-            expenses=expenses,
+            expenses=pager.items,
+            pager=pager,
             categories=categories,
-            page=page,
-            total_pages=total_pages,
-            total=total,
+            category_labels=catalog.labels(db),
             current_year=current_year,
             current_month=current_month,
             display_period=display_period,
             time_params=time_params,
+            next_url=_next_rows_url(pager, request.args),
             # 保留篩選條件（用於分頁連結和表單）
             filters={
                 'category_id': category_id,
@@ -145,6 +168,46 @@ def index():
         db.close()
 
 
+def _expense_row(db, expense):
+    return htmx.render_macro('_rows.html', 'expense_row', expense, catalog.labels(db))
+
+
+@bp.route('/rows')
+@conditional(['expenses', 'categories'])
+def rows():
+    """無限捲動：只回傳下一批 <tr>（同列表篩選條件 + 游標），不計總筆數、不重繪整頁"""
+    if not htmx.is_htmx():
+        return redirect(url_for('expenses.index', **request.args))
+
+    db = Session()
+
+    try:
+        query = db.query(Expense).filter(*filter_criteria(db, request.args))
+        pager = keyset_page(query, Expense, request.args.get('cursor'), with_total=False)
+        return htmx.fragment(htmx.render_macro(
+            '_rows.html', 'expense_batch', pager.items, catalog.labels(db), _next_rows_url(pager, request.args)
+        ))
+    finally:
+        db.close()
+
+
+@bp.route('/<uuid:expense_id>/row')
+def row(expense_id):
+    """單列（HTMX 行內編輯取消時還原）"""
+    if not htmx.is_htmx():
+        return redirect(url_for('expenses.index'))
+
+    db = Session()
+
+    try:
+        expense = db.query(Expense).filter(Expense.id == expense_id).first()
+        if not expense:
+            abort(404)
+        return htmx.fragment(_expense_row(db, expense))
+    finally:
+        db.close()
+
+
 @bp.route('/<uuid:expense_id>/edit', methods=['GET', 'POST'])
 def edit(expense_id):
     """編輯支出"""
@@ -162,15 +225,21 @@ def edit(expense_id):
             expense.date = request.form.get('date') or taipei_today()
 
             db.commit()
+            if htmx.is_htmx():
+                return htmx.fragment(_expense_row(db, expense), message='✅ 支出已更新')
             flash('✅ 支出已更新', 'success')
             return redirect(url_for('expenses.index'))
 
-        # GET: 顯示編輯表單
-        categories = db.query(Category).filter(Category.active == True).all()
+        # GET: 顯示編輯表單（HTMX：把該列換成行內編輯列）
+        categories = catalog.active(db)
+        if htmx.is_htmx():
+            return htmx.fragment(htmx.render_macro('_rows.html', 'expense_edit_row', expense, categories))
         return render_template('expense_edit.html', expense=expense, categories=categories)
 
     except Exception as e:
         db.rollback()
+        if htmx.is_htmx():
+            return htmx.message(f'❌ 更新失敗: {str(e)}')
         flash(f'❌ 更新失敗: {str(e)}', 'error')
         return redirect(url_for('expenses.index'))
     finally:
@@ -189,11 +258,15 @@ def delete(expense_id):
         db.delete(expense)
         db.commit()
 
+        if htmx.is_htmx():
+            return htmx.fragment(message='✅ 支出已刪除')
         flash('✅ 支出已刪除', 'success')
         return redirect(url_for('expenses.index'))
 
     except Exception as e:
         db.rollback()
+        if htmx.is_htmx():
+            return htmx.message(f'❌ 刪除失敗: {str(e)}')
         flash(f'❌ 刪除失敗: {str(e)}', 'error')
         return redirect(url_for('expenses.index'))
     finally:
@@ -220,3 +293,73 @@ def toggle_review(expense_id):
         abort(500)
     finally:
         db.close()
+
+
+@bp.route('/bulk', methods=['POST'])
+def bulk():
+    """批次操作：標記已審核 / 未審核 / 刪除選取
+
+    指定 ids 時只作用於這些支出，否則套用與列表相同的篩選條件；
+    每個動作都是單一 UPDATE / DELETE，回傳影響筆數。
+    """
+    db = Session()
+
+    action = request.form.get('action')
+    ids = request.form.getlist('ids')
+    filters = {field: request.form.get(field) for field in FILTER_FIELDS if request.form.get(field)}
+    wants_json = request.accept_mimetypes.best == 'application/json'
+
+    try:
+        if ids:
+            criteria = [Expense.id.in_([UUID(expense_id) for expense_id in ids])]
+        else:
+            criteria = filter_criteria(db, filters)
+
+        if action in ('review', 'unreview'):
+            reviewed = action == 'review'
+            result = db.execute(
+                update(Expense)
+                .where(*criteria, Expense.reviewed != reviewed)
+                .values(reviewed=reviewed, updated_at=taipei_today())
+                .execution_options(synchronize_session=False)
+            )
+            affected = result.rowcount
+            if affected:
+                cache.bump(db.connection(), {'expenses'})
+            message = f'✅ 已將 {affected} 筆標記為{"已審核" if reviewed else "未審核"}'
+
+        elif action == 'delete':
+            # 只允許刪除明確選取的項目，避免空篩選刪除全部
+            if not ids:
+                raise ValueError('請先勾選要刪除的支出')
+            rows = db.execute(
+                sql_delete(Expense)
+                .where(*criteria)
+                .returning(Expense.date, Expense.category_id, Expense.amount)
+                .execution_options(synchronize_session=False)
+            ).all()
+            affected = len(rows)
+            ledger.apply_changes(db.connection(), [
+                ledger.Change('expenses', day, category_id, -amount, -1)
+                for day, category_id, amount in rows
+            ])
+            message = f'✅ 已刪除 {affected} 筆支出'
+
+        else:
+            raise ValueError(f'未知的批次動作: {action}')
+
+        db.commit()
+
+        if wants_json:
+            return jsonify({'action': action, 'affected': affected})
+        flash(message, 'success')
+        return redirect(url_for('expenses.index', **filters))
+
+    except Exception as e:
+        db.rollback()
+        if wants_json:
+            return jsonify({'error': str(e)}), 400
+        flash(f'❌ 批次操作失敗: {str(e)}', 'error')
+        return redirect(url_for('expenses.index', **filters))
+    finally:
+        db.close()
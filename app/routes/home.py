@@ -1,10 +1,12 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash
-from sqlalchemy import func
 from decimal import Decimal
 from datetime import timedelta
 
 from app.database import Session
-from app.models import Category, Expense, Repayment, Adjustment, CategoryEnum, taipei_today
+from app import ledger, cache, htmx
+from app.conditional import conditional
+from app.catalog import catalog
+from app.models import Expense, Repayment, Adjustment, CategoryEnum, taipei_today
 
 bp = Blueprint('home', __name__)
 
@@ -30,7 +32,24 @@ def get_date_range(preset, today):
     return None, None
 
 
+def category_summaries(db, date_start, date_end):
+    """各類別支出加總 {類別名稱: 金額}（讀類別×月份彙總表）"""
+    totals = ledger.category_totals(db, date_start, date_end)
+
+    # 轉換為字典 {類別名稱: 金額}，確保所有啟用類別都有值（即使為 0）
+    summaries = {
+        info.name.value: totals.get(info.id) or Decimal('0')
+        for info in catalog.active(db)
+    }
+    for cat_enum in CategoryEnum:
+        if cat_enum.value not in summaries:
+            summaries[cat_enum.value] = Decimal('0')
+
+    return summaries
+
+
 @bp.route('/')
+@conditional(['expenses', 'repayments', 'adjustments', 'categories'])
 def index():
     """首頁：Dashboard"""
     db = Session()
@@ -43,37 +62,18 @@ def index():
         # 計算日期範圍
         date_start, date_end = get_date_range(period, today)
 
-        # 計算總額 = Σ支出 - Σ還款 + Σ調整
-        total_expenses = db.query(func.sum(Expense.amount)).scalar() or Decimal('0')
-        total_repayments = db.query(func.sum(Repayment.amount)).scalar() or Decimal('0')
-        total_adjustments = db.query(func.sum(Adjustment.amount)).scalar() or Decimal('0')
-        balance = total_expenses - total_repayments + total_adjustments
-
-        # 5 張摘要卡：各類別加總（加上日期篩選）
-        summary_query = db.query(
-            Category.name,
-            func.sum(Expense.amount).label('total')
-        ).join(Expense).filter(Category.active == True)
-
-        # 加上日期範圍篩選
-        if date_start and date_end:
-            summary_query = summary_query.filter(
-                Expense.date >= date_start,
-                Expense.date <= date_end
-            )
-
-        category_summaries = summary_query.group_by(Category.name).all()
+        # 總額 = Σ支出 - Σ還款 + Σ調整（讀取遞增維護的摘要列）
+        balance = ledger.current_balance(db)
 
-        # 轉換為字典 {類別名稱: 金額}
-        summaries = {cat_name.value: (total or Decimal('0')) for cat_name, total in category_summaries}
-
-        # 確保所有類別都有值（即使為 0）
-        for cat_enum in CategoryEnum:
-            if cat_enum.value not in summaries:
-                summaries[cat_enum.value] = Decimal('0')
+        # 5 張摘要卡：各類別加總（依日期範圍與資料版本快取）
+        summaries = cache.cached(
+            db, 'home.summaries', ['expenses', 'categories'],
+            {'date_start': date_start, 'date_end': date_end},
+            lambda: category_summaries(db, date_start, date_end)
+        )
 
-        # 取得所有啟用的類別（用於下拉選單）
-        categories = db.query(Category).filter(Category.active == True).all()
+        # 取得所有啟用的類別（用於下拉選單，來自行程內目錄）
+        categories = catalog.active(db)
 
         # 計算顯示的年月
         if period == 'last_month' and date_start:
@@ -97,6 +97,21 @@ def index():
         db.close()
 
 
+def _dashboard_fragment(db, row, message, summaries=False):
+    """HTMX 新增後的回應：新的「剛新增」列 + out-of-band 更新總額（支出另更新摘要卡）"""
+    parts = [row, htmx.render_macro('_fragments.html', 'balance_card', ledger.current_balance(db), oob=True)]
+    if summaries:
+        period = request.form.get('period', 'this_month')
+        date_start, date_end = get_date_range(period, taipei_today())
+        totals = cache.cached(
+            db, 'home.summaries', ['expenses', 'categories'],
+            {'date_start': date_start, 'date_end': date_end},
+            lambda: category_summaries(db, date_start, date_end)
+        )
+        parts.append(htmx.render_macro('_fragments.html', 'summary_cards', totals, period, oob=True))
+    return htmx.fragment(*parts, message=message, trigger='entry-added')
+
+
 @bp.route('/expenses/add', methods=['POST'])
 def add_expense():
     """新增支出（HTMX）"""
@@ -110,6 +125,8 @@ def add_expense():
 
         # 驗證
         if not all([category_id, name, amount]):
+            if htmx.is_htmx():
+                return htmx.message('請填寫所有必填欄位')
             flash('請填寫所有必填欄位', 'error')
             return redirect(url_for('home.index'))
 
@@ -123,11 +140,18 @@ def add_expense():
         db.add(expense)
         db.commit()
 
+        if htmx.is_htmx():
+            info = catalog.get(db, expense.category_id)
+            label = f"{info.name.value if info else ''} {expense.name}"
+            row = htmx.render_macro('_rows.html', 'recent_row', '支出', expense.date, label, expense.amount)
+            return _dashboard_fragment(db, row, '✅ 支出已新增', summaries=True)
         flash('✅ 支出已新增', 'success')
         return redirect(url_for('home.index'))
 
     except Exception as e:
         db.rollback()
+        if htmx.is_htmx():
+            return htmx.message(f'❌ 新增失敗: {str(e)}')
         flash(f'❌ 新增失敗: {str(e)}', 'error')
         return redirect(url_for('home.index'))
     finally:
@@ -144,6 +168,8 @@ def add_repayment():
         date = request.form.get('date') or taipei_today()
 
         if not amount:
+            if htmx.is_htmx():
+                return htmx.message('請輸入還款金額')
             flash('請輸入還款金額', 'error')
             return redirect(url_for('home.index'))
 
@@ -154,11 +180,16 @@ def add_repayment():
         db.add(repayment)
         db.commit()
 
+        if htmx.is_htmx():
+            row = htmx.render_macro('_rows.html', 'recent_row', '還款', repayment.date, '', repayment.amount)
+            return _dashboard_fragment(db, row, '✅ 還款已記錄')
         flash('✅ 還款已記錄', 'success')
         return redirect(url_for('home.index'))
 
     except Exception as e:
         db.rollback()
+        if htmx.is_htmx():
+            return htmx.message(f'❌ 新增失敗: {str(e)}')
         flash(f'❌ 新增失敗: {str(e)}', 'error')
         return redirect(url_for('home.index'))
     finally:
@@ -176,6 +207,8 @@ def add_adjustment():
         date = request.form.get('date') or taipei_today()
 
         if not amount or not description:
+            if htmx.is_htmx():
+                return htmx.message('請填寫所有必填欄位')
             flash('請填寫所有必填欄位', 'error')
             return redirect(url_for('home.index'))
 
@@ -187,11 +220,18 @@ def add_adjustment():
         db.add(adjustment)
         db.commit()
 
+        if htmx.is_htmx():
+            row = htmx.render_macro(
+                '_rows.html', 'recent_row', '調整', adjustment.date, adjustment.description, adjustment.amount
+            )
+            return _dashboard_fragment(db, row, '✅ 調整項目已新增')
         flash('✅ 調整項目已新增', 'success')
         return redirect(url_for('home.index'))
 
     except Exception as e:
         db.rollback()
+        if htmx.is_htmx():
+            return htmx.message(f'❌ 新增失敗: {str(e)}')
         flash(f'❌ 新增失敗: {str(e)}', 'error')
         return redirect(url_for('home.index'))
     finally:
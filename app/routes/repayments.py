@@ -3,6 +3,9 @@ from datetime import timedelta
 from decimal import Decimal
 
 from app.database import Session
+from app.pagination import paginate
+from app import htmx
+from app.conditional import conditional
 from app.models import Repayment, taipei_today
 
 bp = Blueprint('repayments', __name__, url_prefix='/repayments')
@@ -30,6 +33,7 @@ def get_date_range(preset):
 
 
 @bp.route('/')
+@conditional(['repayments'])
 def index():
     """還款流水頁"""
     db = Session()
@@ -41,7 +45,6 @@ def index():
         end_date = request.args.get('end_date')
         min_amount = request.args.get('min_amount')
         max_amount = request.args.get('max_amount')
-        page = int(request.args.get('page', 1))
 
         # 建立查詢
         query = db.query(Repayment)
@@ -63,21 +66,13 @@ def index():
         if max_amount:
             query = query.filter(Repayment.amount <= Decimal(max_amount))
 
-        # 排序：日期新→舊
-        query = query.order_by(Repayment.date.desc(), Repayment.created_at.desc())
-
-        # 分頁（每頁 50 筆）
-        per_page = 50
-        total = query.count()
-        total_pages = (total + per_page - 1) // per_page
-        repayments = query.limit(per_page).offset((page - 1) * per_page).all()
+        # 分頁（每頁 50 筆）：日期新→舊，游標分頁；舊版 ?page= 連結仍可用
+        pager = paginate(query, Repayment, request.args)
 
         return render_template(
             'repayments.html',
-            repayments=repayments,
-            page=page,
-            total_pages=total_pages,
-            total=total,
+            repayments=pager.items,
+            pager=pager,
             filters={
                 'preset': preset,
                 'start_date': start_date,
@@ -90,6 +85,23 @@ def index():
         db.close()
 
 
+@bp.route('/<uuid:repayment_id>/row')
+def row(repayment_id):
+    """單列（HTMX 行內編輯取消時還原）"""
+    if not htmx.is_htmx():
+        return redirect(url_for('repayments.index'))
+
+    db = Session()
+
+    try:
+        repayment = db.query(Repayment).filter(Repayment.id == repayment_id).first()
+        if not repayment:
+            abort(404)
+        return htmx.fragment(htmx.render_macro('_rows.html', 'repayment_row', repayment))
+    finally:
+        db.close()
+
+
 @bp.route('/<uuid:repayment_id>/edit', methods=['GET', 'POST'])
 def edit(repayment_id):
     """編輯還款"""
@@ -105,14 +117,20 @@ def edit(repayment_id):
             repayment.date = request.form.get('date') or taipei_today()
 
             db.commit()
+            if htmx.is_htmx():
+                return htmx.fragment(htmx.render_macro('_rows.html', 'repayment_row', repayment), message='✅ 還款已更新')
             flash('✅ 還款已更新', 'success')
             return redirect(url_for('repayments.index'))
 
-        # GET: 顯示編輯表單
+        # GET: 顯示編輯表單（HTMX：把該列換成行內編輯列）
+        if htmx.is_htmx():
+            return htmx.fragment(htmx.render_macro('_rows.html', 'repayment_edit_row', repayment))
         return render_template('repayment_edit.html', repayment=repayment)
 
     except Exception as e:
         db.rollback()
+        if htmx.is_htmx():
+            return htmx.message(f'❌ 更新失敗: {str(e)}')
         flash(f'❌ 更新失敗: {str(e)}', 'error')
         return redirect(url_for('repayments.index'))
     finally:
@@ -131,11 +149,15 @@ def delete(repayment_id):
         db.delete(repayment)
         db.commit()
 
+        if htmx.is_htmx():
+            return htmx.fragment(message='✅ 還款已刪除')
         flash('✅ 還款已刪除', 'success')
         return redirect(url_for('repayments.index'))
 
     except Exception as e:
         db.rollback()
+        if htmx.is_htmx():
+            return htmx.message(f'❌ 刪除失敗: {str(e)}')
         flash(f'❌ 刪除失敗: {str(e)}', 'error')
         return redirect(url_for('repayments.index'))
     finally:
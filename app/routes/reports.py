@@ -1,15 +1,21 @@
-from flask import Blueprint, render_template, request, make_response
-from sqlalchemy import func, extract
+from flask import Blueprint, render_template, request, redirect, url_for, flash, Response, stream_with_context, jsonify, abort
+from sqlalchemy import select, union_all, literal, null
 from datetime import timedelta
 from decimal import Decimal
 import csv
-from io import StringIO
+import zlib
 
 from app.database import Session
-from app.models import Category, Expense, Repayment, Adjustment, taipei_today
+from app import series, ledger, cache, importer
+from app.catalog import catalog
+from app.conditional import conditional
+from app.models import Expense, Repayment, Adjustment, taipei_today
 
 bp = Blueprint('reports', __name__, url_prefix='/reports')
 
+# 匯出時每批從伺服器端游標取回的筆數
+EXPORT_BATCH_SIZE = 1000
+
 
 def get_date_range(preset):
     """根據預設選項計算日期範圍"""
@@ -32,212 +38,326 @@ def get_date_range(preset):
     return None, None
 
 
+def _max_points(value):
+    """折線圖最多點數（?points=，超過時降採樣）"""
+    try:
+        points = int(value)
+    except (TypeError, ValueError):
+        return series.DEFAULT_MAX_POINTS
+    return min(max(points, 3), series.DEFAULT_MAX_POINTS * 4)
+
+
+def _pie_chart(db, date_start, date_end):
+    """圓餅圖：各分類支出占比（讀類別×月份彙總表）"""
+    totals = ledger.category_totals(db, date_start, date_end)
+    active = [info for info in catalog.active(db) if info.id in totals]
+
+    return {
+        'labels': [info.name.value for info in active],
+        'data': [float(totals[info.id] or 0) for info in active]
+    }
+
+
+def _bar_chart(db, date_start, date_end):
+    """長條圖：按月支出總額（讀類別×月份彙總表）"""
+    bar_data = ledger.monthly_expense_totals(db, date_start, date_end)
+
+    return {
+        'labels': [f"{month.year}-{month.month:02d}" for month, total in bar_data],
+        'data': [float(total or 0) for month, total in bar_data]
+    }
+
+
+def _line_chart(db, date_start, date_end, max_points):
+    """折線圖：累積餘額（支出 - 還款 + 調整），資料庫端依日/週/月分桶累加
+
+    起點為範圍開始前的真實餘額（月底快照 + 當月差額），不再從 0 起算。
+    """
+    bucket, points = series.cumulative_series(db, date_start, date_end)
+    points = series.downsample(points, max_points)
+    opening = ledger.opening_balance(db, date_start) if date_start and date_end else Decimal('0')
+
+    return {
+        'labels': [str(period) for period, total in points],
+        'data': [float(opening + total) for period, total in points],
+        'bucket': bucket
+    }
+
+
+def _report_range(args):
+    """報表日期參數（預設本月）→ (preset, start_date, end_date, date_start, date_end)"""
+    preset = args.get('preset', 'this_month')
+    start_date = args.get('start_date')
+    end_date = args.get('end_date')
+
+    if preset and preset != 'custom':
+        date_start, date_end = get_date_range(preset)
+    else:
+        date_start = start_date
+        date_end = end_date
+    return preset, start_date, end_date, date_start, date_end
+
+
+# 圖表名稱 → 依賴的資料表（結果依 (日期範圍, 資料版本) 快取，寫入後自動失效）
+CHART_TABLES = {
+    'pie': ['expenses', 'categories'],
+    'bar': ['expenses'],
+    'line': ['expenses', 'repayments', 'adjustments'],
+}
+
+
 @bp.route('/')
+@conditional()
 def index():
-    """報表頁"""
+    """報表頁（只輸出頁面框架，三張圖由瀏覽器向 /reports/charts/<圖表> 平行取得）"""
+    preset, start_date, end_date, _, _ = _report_range(request.args)
+
+    chart_params = {
+        key: value for key, value in request.args.items()
+        if key in ('preset', 'start_date', 'end_date', 'points') and value
+    }
+    return render_template(
+        'reports.html',
+        chart_urls={chart: url_for('reports.chart', chart=chart, **chart_params) for chart in CHART_TABLES},
+        preset=preset,
+        start_date=start_date,
+        end_date=end_date
+    )
+
+
+@bp.route('/charts/<chart>')
+@conditional(lambda chart: CHART_TABLES.get(chart, []))
+def chart(chart):
+    """單張圖表資料（JSON），參數同報表頁（preset / start_date / end_date，折線圖另有 points）"""
+    if chart not in CHART_TABLES:
+        abort(404)
+    _, _, _, date_start, date_end = _report_range(request.args)
+
     db = Session()
 
     try:
-        # 日期範圍（預設本月）
-        preset = request.args.get('preset', 'this_month')
-        start_date = request.args.get('start_date')
-        end_date = request.args.get('end_date')
-
-        # 計算日期範圍
-        if preset and preset != 'custom':
-            date_start, date_end = get_date_range(preset)
+        params = {'date_start': date_start, 'date_end': date_end}
+        if chart == 'pie':
+            compute = lambda: _pie_chart(db, date_start, date_end)
+        elif chart == 'bar':
+            compute = lambda: _bar_chart(db, date_start, date_end)
         else:
-            date_start = start_date
-            date_end = end_date
-
-        # 1. 圓餅圖：各分類支出占比
-        pie_data = db.query(
-            Category.name,
-            func.sum(Expense.amount).label('total')
-        ).join(Expense).filter(Category.active == True)
-
-        if date_start and date_end:
-            pie_data = pie_data.filter(Expense.date >= date_start, Expense.date <= date_end)
-
-        pie_data = pie_data.group_by(Category.name).all()
-
-        pie_chart = {
-            'labels': [cat_name.value for cat_name, total in pie_data],
-            'data': [float(total or 0) for cat_name, total in pie_data]
-        }
-
-        # 2. 長條圖：按月支出總額
-        bar_data = db.query(
-            extract('year', Expense.date).label('year'),
-            extract('month', Expense.date).label('month'),
-            func.sum(Expense.amount).label('total')
-        )
+            params['points'] = _max_points(request.args.get('points'))
+            compute = lambda: _line_chart(db, date_start, date_end, params['points'])
 
-        if date_start and date_end:
-            bar_data = bar_data.filter(Expense.date >= date_start, Expense.date <= date_end)
-
-        bar_data = bar_data.group_by('year', 'month').order_by('year', 'month').all()
-
-        bar_chart = {
-            'labels': [f"{int(year)}-{int(month):02d}" for year, month, total in bar_data],
-            'data': [float(total or 0) for year, month, total in bar_data]
-        }
-
-        # 3. 折線圖：累積餘額（支出 - 還款 + 調整）
-        # 取得所有支出、還款、調整，排序後計算累積
-        expenses = db.query(Expense.date, Expense.amount).order_by(Expense.date)
-        repayments = db.query(Repayment.date, Repayment.amount).order_by(Repayment.date)
-        adjustments = db.query(Adjustment.date, Adjustment.amount).order_by(Adjustment.date)
-
-        if date_start and date_end:
-            expenses = expenses.filter(Expense.date >= date_start, Expense.date <= date_end)
-            repayments = repayments.filter(Repayment.date >= date_start, Repayment.date <= date_end)
-            adjustments = adjustments.filter(Adjustment.date >= date_start, Adjustment.date <= date_end)
-
-        # 合併成時間序列
-        transactions = []
-        for date, amount in expenses.all():
-            transactions.append((date, float(amount)))
-        for date, amount in repayments.all():
-            transactions.append((date, -float(amount)))  # 還款為負
-        for date, amount in adjustments.all():
-            transactions.append((date, float(amount)))  # 調整依正負值
-
-        transactions.sort(key=lambda x: x[0])
-
-        # 計算累積餘額
-        cumulative = 0
-        line_chart_dates = []
-        line_chart_data = []
-
-        for date, amount in transactions:
-            cumulative += amount
-            line_chart_dates.append(str(date))
-            line_chart_data.append(cumulative)
-
-        line_chart = {
-            'labels': line_chart_dates,
-            'data': line_chart_data
-        }
-
-        return render_template(
-            'reports.html',
-            pie_chart=pie_chart,
-            bar_chart=bar_chart,
-            line_chart=line_chart,
-            preset=preset,
-            start_date=start_date,
-            end_date=end_date
-        )
+        data = cache.cached(db, f'reports.{chart}', CHART_TABLES[chart], params, compute)
+        return jsonify(data)
     finally:
         db.close()
 
 
 @bp.route('/export')
+@conditional(['expenses', 'repayments', 'adjustments', 'categories'])
 def export():
-    """CSV 匯出"""
+    """CSV 匯出（串流輸出，記憶體用量不隨筆數成長）"""
+    export_type = request.args.get('type', 'expenses')  # expenses / repayments / combined
+    preset = request.args.get('preset', '')
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    use_gzip = request.args.get('gzip') == '1'
+
+    # 計算日期範圍
+    if preset and preset != 'custom':
+        date_start, date_end = get_date_range(preset)
+    else:
+        date_start = start_date
+        date_end = end_date
+
+    if export_type == 'expenses':
+        filename = 'expenses.csv'
+    elif export_type == 'repayments':
+        filename = 'repayments.csv'
+    else:
+        export_type = 'combined'
+        filename = 'combined.csv'
+
+    def generate():
+        db = Session()
+        try:
+            if export_type == 'expenses':
+                yield from _export_expenses(db, date_start, date_end)
+            elif export_type == 'repayments':
+                yield from _export_repayments(db, date_start, date_end)
+            else:
+                yield from _export_combined(db, date_start, date_end)
+        finally:
+            db.close()
+
+    body = _encode_csv(generate())
+    if use_gzip:
+        body = _gzip_stream(body)
+        filename += '.gz'
+        content_type = 'application/gzip'
+    else:
+        content_type = 'text/csv; charset=utf-8-sig'
+
+    # 建立串流回應（UTF-8 with BOM for Excel）
+    response = Response(stream_with_context(body), content_type=content_type)
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    return response
+
+
+@bp.route('/import', methods=['POST'])
+def import_csv():
+    """CSV 批次匯入（格式同匯出：支出 / 還款 / 合併）"""
     db = Session()
 
     try:
-        export_type = request.args.get('type', 'expenses')  # expenses / repayments / combined
-        preset = request.args.get('preset', '')
-        start_date = request.args.get('start_date')
-        end_date = request.args.get('end_date')
-
-        # 計算日期範圍
-        if preset and preset != 'custom':
-            date_start, date_end = get_date_range(preset)
-        else:
-            date_start = start_date
-            date_end = end_date
-
-        output = StringIO()
-        writer = csv.writer(output)
-
-        if export_type == 'expenses':
-            # 支出匯出
-            writer.writerow(['日期', '類別', '名稱', '金額'])
-
-            query = db.query(Expense).join(Category).order_by(Expense.date.desc())
-            if date_start and date_end:
-                query = query.filter(Expense.date >= date_start, Expense.date <= date_end)
-
-            for expense in query.all():
-                writer.writerow([
-                    expense.date,
-                    expense.category.name.value,
-                    expense.name,
-                    expense.amount
-                ])
-
-            filename = 'expenses.csv'
-
-        elif export_type == 'repayments':
-            # 還款匯出
-            writer.writerow(['日期', '金額'])
-
-            query = db.query(Repayment).order_by(Repayment.date.desc())
-            if date_start and date_end:
-                query = query.filter(Repayment.date >= date_start, Repayment.date <= date_end)
-
-            for repayment in query.all():
-                writer.writerow([repayment.date, repayment.amount])
-
-            filename = 'repayments.csv'
-
-        else:  # combined
-            # 合併匯出
-            writer.writerow(['類型', '日期', '類別', '名稱/說明', '金額'])
-
-            # 支出
-            expenses_query = db.query(Expense).join(Category).order_by(Expense.date.desc())
-            if date_start and date_end:
-                expenses_query = expenses_query.filter(Expense.date >= date_start, Expense.date <= date_end)
-
-            for expense in expenses_query.all():
-                writer.writerow([
-                    '支出',
-                    expense.date,
-                    expense.category.name.value,
-                    expense.name,
-                    expense.amount
-                ])
-
-            # 還款
-            repayments_query = db.query(Repayment).order_by(Repayment.date.desc())
-            if date_start and date_end:
-                repayments_query = repayments_query.filter(Repayment.date >= date_start, Repayment.date <= date_end)
-
-            for repayment in repayments_query.all():
-                writer.writerow([
-                    '還款',
-                    repayment.date,
-                    '',
-                    '',
-                    repayment.amount
-                ])
-
-            # 調整
-            adjustments_query = db.query(Adjustment).order_by(Adjustment.date.desc())
-            if date_start and date_end:
-                adjustments_query = adjustments_query.filter(Adjustment.date >= date_start, Adjustment.date <= date_end)
-
-            for adjustment in adjustments_query.all():
-                writer.writerow([
-                    '調整',
-                    adjustment.date,
-                    '',
-                    adjustment.description,
-                    adjustment.amount
-                ])
-
-            filename = 'combined.csv'
-
-        # 建立回應（UTF-8 with BOM for Excel）
-        response = make_response(output.getvalue())
-        response.headers['Content-Type'] = 'text/csv; charset=utf-8-sig'
-        response.headers['Content-Disposition'] = f'attachment; filename={filename}'
-        return response
+        upload = request.files.get('file')
+        if not upload or not upload.filename:
+            flash('請選擇要匯入的 CSV 檔案', 'error')
+            return redirect(url_for('reports.index'))
+
+        try:
+            chunk_size = max(int(request.form.get('chunk_size', importer.DEFAULT_CHUNK_SIZE)), 1)
+        except ValueError:
+            chunk_size = importer.DEFAULT_CHUNK_SIZE
+
+        result = importer.import_csv(
+            db, importer.open_text(upload.stream, upload.filename), chunk_size
+        )
+        db.commit()
+
+        flash(
+            f'✅ 已匯入 {result.total_inserted} 筆'
+            f'（支出 {result.inserted["expenses"]} / 還款 {result.inserted["repayments"]}'
+            f' / 調整 {result.inserted["adjustments"]}）',
+            'success'
+        )
+        for issue in result.errors[:10]:
+            flash(f'❌ 第 {issue.line} 列: {issue.message}', 'error')
+        if len(result.errors) > 10:
+            flash(f'❌ 另有 {len(result.errors) - 10} 列錯誤未顯示', 'error')
+
+        return redirect(url_for('reports.index'))
 
+    except Exception as e:
+        db.rollback()
+        flash(f'❌ 匯入失敗: {str(e)}', 'error')
+        return redirect(url_for('reports.index'))
     finally:
         db.close()
+
+
+class _LineBuffer:
+    """csv.writer 的寫入目標：暫存一批列，交給 generator 送出"""
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, value):
+        self.parts.append(value)
+
+    def drain(self):
+        chunk = ''.join(self.parts)
+        self.parts.clear()
+        return chunk
+
+
+def _encode_csv(rows):
+    """將列轉為 UTF-8 位元組串流：先送 BOM 與標題，之後每批送出一次"""
+    buffer = _LineBuffer()
+    writer = csv.writer(buffer)
+
+    yield '\ufeff'.encode('utf-8')
+
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= EXPORT_BATCH_SIZE:
+            yield buffer.drain().encode('utf-8')
+            pending = 0
+
+    chunk = buffer.drain()
+    if chunk:
+        yield chunk.encode('utf-8')
+
+
+def _gzip_stream(chunks):
+    """即時 gzip 壓縮串流"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31：gzip 格式
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _stream(query):
+    """以伺服器端游標分批取回，不一次載入全部結果"""
+    return query.yield_per(EXPORT_BATCH_SIZE)
+
+
+def _export_expenses(db, date_start, date_end):
+    """支出匯出"""
+    yield ['日期', '類別', '名稱', '金額']
+
+    labels = catalog.labels(db)
+    query = db.query(
+        Expense.date, Expense.category_id, Expense.name, Expense.amount
+    ).order_by(Expense.date.desc())
+    if date_start and date_end:
+        query = query.filter(Expense.date >= date_start, Expense.date <= date_end)
+
+    for date, category_id, name, amount in _stream(query):
+        yield [date, labels.get(category_id, ''), name, amount]
+
+
+def _export_repayments(db, date_start, date_end):
+    """還款匯出"""
+    yield ['日期', '金額']
+
+    query = db.query(Repayment.date, Repayment.amount).order_by(Repayment.date.desc())
+    if date_start and date_end:
+        query = query.filter(Repayment.date >= date_start, Repayment.date <= date_end)
+
+    for date, amount in _stream(query):
+        yield [date, amount]
+
+
+def _export_combined(db, date_start, date_end):
+    """合併匯出：三表 UNION ALL 依日期排序成單一流水帳，附累積餘額"""
+    yield ['類型', '日期', '類別', '名稱/說明', '金額', '累積餘額']
+
+    expenses = select(
+        literal('支出').label('kind'),
+        Expense.date.label('date'),
+        Expense.created_at.label('created_at'),
+        Expense.id.label('id'),
+        Expense.category_id.label('category'),
+        Expense.name.label('label'),
+        Expense.amount.label('amount'),
+    )
+    repayments = select(
+        literal('還款'), Repayment.date, Repayment.created_at, Repayment.id,
+        null(), literal(''), Repayment.amount,
+    )
+    adjustments = select(
+        literal('調整'), Adjustment.date, Adjustment.created_at, Adjustment.id,
+        null(), Adjustment.description, Adjustment.amount,
+    )
+
+    if date_start and date_end:
+        expenses = expenses.where(Expense.date >= date_start, Expense.date <= date_end)
+        repayments = repayments.where(Repayment.date >= date_start, Repayment.date <= date_end)
+        adjustments = adjustments.where(Adjustment.date >= date_start, Adjustment.date <= date_end)
+
+    merged = union_all(expenses, repayments, adjustments).subquery()
+    query = select(
+        merged.c.kind, merged.c.date, merged.c.category, merged.c.label, merged.c.amount
+    ).order_by(merged.c.date, merged.c.created_at, merged.c.id)
+
+    labels = catalog.labels(db)
+
+    # 累積餘額 = Σ支出 - Σ還款 + Σ調整（依時間順序逐列累加，從範圍開始前的餘額起算）
+    balance = ledger.opening_balance(db, date_start) if date_start and date_end else Decimal('0')
+    rows = db.execute(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+    for kind, date, category, label, amount in rows:
+        balance += -amount if kind == '還款' else amount
+        yield [kind, date, labels.get(category, ''), label, amount, balance]
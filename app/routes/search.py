@@ -0,0 +1,73 @@
+from flask import Blueprint, render_template, request, flash
+from decimal import Decimal, InvalidOperation
+
+from app.database import Session
+from app.catalog import catalog
+from app.routes.adjustments import get_date_range
+from app import search
+
+bp = Blueprint('search', __name__, url_prefix='/search')
+
+
+def _amount(value):
+    try:
+        return Decimal(value) if value else None
+    except InvalidOperation:
+        return None
+
+
+@bp.route('/')
+def index():
+    """搜尋支出名稱與調整說明（依相似度排序）"""
+    db = Session()
+
+    try:
+        # 搜尋參數
+        q = request.args.get('q', '').strip()
+        kind = request.args.get('kind', '')
+        preset = request.args.get('preset', '')
+        start_date = request.args.get('start_date')
+        end_date = request.args.get('end_date')
+        min_amount = request.args.get('min_amount')
+        max_amount = request.args.get('max_amount')
+
+        # 日期篩選：預設區間優先，其次自訂起訖
+        if preset and preset != 'custom':
+            date_start, date_end = get_date_range(preset)
+        else:
+            date_start, date_end = start_date or None, end_date or None
+
+        hits = []
+        if q:
+            hits = search.search(
+                db, q,
+                kinds=[kind] if kind in search.SEARCH_COLUMNS else None,
+                date_start=date_start,
+                date_end=date_end,
+                min_amount=_amount(min_amount),
+                max_amount=_amount(max_amount),
+            )
+
+        return render_template(
+            'search.html',
+            hits=hits,
+            limit=search.DEFAULT_LIMIT,
+            category_labels=catalog.labels(db),
+            filters={
+                'q': q,
+                'kind': kind,
+                'preset': preset,
+                'start_date': start_date,
+                'end_date': end_date,
+                'min_amount': min_amount,
+                'max_amount': max_amount
+            }
+        )
+
+    except Exception as e:
+        db.rollback()
+        flash(f'❌ 搜尋失敗: {str(e)}', 'error')
+        return render_template('search.html', hits=[], limit=search.DEFAULT_LIMIT,
+                               category_labels={}, filters=request.args)
+    finally:
+        db.close()
@@ -0,0 +1,86 @@
+"""支出名稱 / 調整說明搜尋：pg_trgm trigram GIN 索引 + word_similarity 排序
+
+ILIKE '%詞%' 與 %> 運算子都能走 gin_trgm_ops 索引，不需掃全表；
+支出與調整各自依相似度取前 N 筆後合併，兩邊都只讀索引命中的列。
+"""
+from collections import namedtuple
+
+from sqlalchemy import func, or_, select, literal, null, text
+
+from app.models import Expense, Adjustment
+
+DEFAULT_LIMIT = 100
+
+SearchHit = namedtuple('SearchHit', ['kind', 'id', 'date', 'label', 'amount', 'category_id', 'score'])
+
+# 類型 → (模型, 搜尋欄位)
+SEARCH_COLUMNS = {
+    'expenses': (Expense, Expense.name),
+    'adjustments': (Adjustment, Adjustment.description),
+}
+
+
+def create_extension(connection):
+    """建立 pg_trgm 擴充（建表前呼叫，gin_trgm_ops 才存在；既有資料庫的索引由遷移 0001 補建）"""
+    if connection.dialect.name == 'postgresql':
+        connection.execute(text('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+
+
+def escape_like(term):
+    """跳脫 LIKE 萬用字元，讓使用者輸入的 % 與 _ 以字面比對"""
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def contains(column, term):
+    """欄位包含 term（不分大小寫）；有 trigram 索引時由索引處理"""
+    return column.ilike(f'%{escape_like(term)}%', escape='\\')
+
+
+def _search_one(db, kind, term, criteria, limit):
+    model, column = SEARCH_COLUMNS[kind]
+    score = func.word_similarity(term, column)
+    category_id = model.category_id if model is Expense else null()
+
+    statement = (
+        select(
+            literal(kind).label('kind'),
+            model.id,
+            model.date,
+            column.label('label'),
+            model.amount,
+            category_id.label('category_id'),
+            score.label('score'),
+        )
+        # 子字串命中，或與某個詞足夠相近（容許錯字）：column %> term
+        .where(or_(contains(column, term), column.op('%>')(term)), *criteria(model))
+        .order_by(score.desc(), model.date.desc(), model.id.desc())
+        .limit(limit)
+    )
+    return [SearchHit(*row) for row in db.execute(statement)]
+
+
+def search(db, term, kinds=None, date_start=None, date_end=None,
+           min_amount=None, max_amount=None, limit=DEFAULT_LIMIT):
+    """依相似度搜尋支出名稱與調整說明，可再以日期與金額範圍篩選"""
+    term = (term or '').strip()
+    if not term:
+        return []
+
+    def criteria(model):
+        conditions = []
+        if date_start:
+            conditions.append(model.date >= date_start)
+        if date_end:
+            conditions.append(model.date <= date_end)
+        if min_amount is not None:
+            conditions.append(model.amount >= min_amount)
+        if max_amount is not None:
+            conditions.append(model.amount <= max_amount)
+        return conditions
+
+    hits = []
+    for kind in kinds or SEARCH_COLUMNS:
+        hits.extend(_search_one(db, kind, term, criteria, limit))
+
+    hits.sort(key=lambda hit: (hit.score, hit.date), reverse=True)
+    return hits[:limit]
@@ -0,0 +1,133 @@
+"""報表時間序列：資料庫端累積餘額 + 時間分桶 + 降採樣"""
+from datetime import date as date_type
+
+from sqlalchemy import Date, cast, func, literal_column, select, union_all
+
+from app.models import Expense, Repayment, Adjustment
+
+# 折線圖預設最多點數（超過時以 LTTB 降採樣）
+DEFAULT_MAX_POINTS = 500
+
+BUCKETS = ('day', 'week', 'month')
+
+
+def _to_date(value):
+    if isinstance(value, str):
+        return date_type.fromisoformat(value) if value else None
+    return value
+
+
+def choose_bucket(date_start, date_end):
+    """依日期範圍長度選擇分桶：兩個月內按日、兩年內按週、其餘按月"""
+    if not date_start or not date_end:
+        return 'month'
+
+    span = (_to_date(date_end) - _to_date(date_start)).days
+    if span <= 62:
+        return 'day'
+    if span <= 731:
+        return 'week'
+    return 'month'
+
+
+def ledger_bounds(db):
+    """全部資料的最早/最晚日期（三次索引查詢）"""
+    starts, ends = [], []
+    for model in (Expense, Repayment, Adjustment):
+        low, high = db.query(func.min(model.date), func.max(model.date)).one()
+        if low:
+            starts.append(low)
+            ends.append(high)
+    if not starts:
+        return None, None
+    return min(starts), max(ends)
+
+
+def signed_transactions(date_start=None, date_end=None):
+    """三表合併為 (date, amount)：支出為正、還款為負、調整依正負值"""
+    expenses = select(Expense.date.label('date'), Expense.amount.label('amount'))
+    repayments = select(Repayment.date, -Repayment.amount)
+    adjustments = select(Adjustment.date, Adjustment.amount)
+
+    if date_start and date_end:
+        expenses = expenses.where(Expense.date >= date_start, Expense.date <= date_end)
+        repayments = repayments.where(Repayment.date >= date_start, Repayment.date <= date_end)
+        adjustments = adjustments.where(Adjustment.date >= date_start, Adjustment.date <= date_end)
+
+    return union_all(expenses, repayments, adjustments).subquery('transactions')
+
+
+def cumulative_series(db, date_start=None, date_end=None, bucket=None):
+    """資料庫端計算每個時間桶結束時的累積餘額
+
+    回傳 (bucket, [(桶起始日, 累積金額 Decimal), ...])。
+    """
+    if bucket is None:
+        if date_start and date_end:
+            bucket = choose_bucket(date_start, date_end)
+        else:
+            bucket = choose_bucket(*ledger_bounds(db))
+
+    if bucket not in BUCKETS:
+        raise ValueError(f"不支援的分桶: {bucket}")
+
+    # 分桶單位以字面值嵌入，讓 SELECT 與 GROUP BY 的運算式完全相同
+    transactions = signed_transactions(date_start, date_end)
+    unit = literal_column(f"'{bucket}'")
+    period = cast(func.date_trunc(unit, transactions.c.date), Date).label('period')
+    per_period = (
+        select(period, func.sum(transactions.c.amount).label('net'))
+        .group_by(period)
+        .subquery('per_period')
+    )
+    running = func.sum(per_period.c.net).over(order_by=per_period.c.period)
+    stmt = select(per_period.c.period, running).order_by(per_period.c.period)
+
+    return bucket, [(period, total) for period, total in db.execute(stmt)]
+
+
+def downsample(points, threshold):
+    """Largest-Triangle-Three-Buckets 降採樣，保留曲線形狀、點數固定
+
+    points 為 [(x, y), ...]，x 須遞增且可轉為數值（日期以 toordinal）。
+    """
+    if threshold is None or threshold < 3 or len(points) <= threshold:
+        return list(points)
+
+    def x_of(point):
+        x = point[0]
+        return x.toordinal() if hasattr(x, 'toordinal') else x
+
+    sampled = [points[0]]
+    every = (len(points) - 2) / (threshold - 2)
+    a = 0
+
+    for i in range(threshold - 2):
+        # 下一個桶的平均點
+        avg_start = int((i + 1) * every) + 1
+        avg_end = min(int((i + 2) * every) + 1, len(points))
+        avg_range = points[avg_start:avg_end]
+        avg_x = sum(x_of(p) for p in avg_range) / len(avg_range)
+        avg_y = sum(float(p[1]) for p in avg_range) / len(avg_range)
+
+        # 目前桶中與前一選定點、下一桶平均點構成最大三角形者
+        range_start = int(i * every) + 1
+        range_end = int((i + 1) * every) + 1
+        ax, ay = x_of(points[a]), float(points[a][1])
+
+        best_area = -1
+        best_index = range_start
+        for j in range(range_start, range_end):
+            area = abs(
+                (ax - avg_x) * (float(points[j][1]) - ay)
+                - (ax - x_of(points[j])) * (avg_y - ay)
+            )
+            if area > best_area:
+                best_area = area
+                best_index = j
+
+        sampled.append(points[best_index])
+        a = best_index
+
+    sampled.append(points[-1])
+    return sampled
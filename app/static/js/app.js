@@ -1,12 +1,8 @@
-// 刪除確認
-document.addEventListener('DOMContentLoaded', function() {
-    // 刪除按鈕確認
-    document.querySelectorAll('[data-confirm]').forEach(function(element) {
-        element.addEventListener('click', function(e) {
-            if (!confirm('確定要刪除嗎？此動作無法復原。')) {
-                e.preventDefault();
-                return false;
-            }
-        });
-    });
-});
+// 刪除確認（事件委派：HTMX 之後換入的列也適用）
+document.addEventListener('click', function(e) {
+    const element = e.target.closest('[data-confirm]');
+    if (element && !confirm('確定要刪除嗎？此動作無法復原。')) {
+        e.preventDefault();
+        e.stopImmediatePropagation();
+    }
+}, true);
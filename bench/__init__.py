@@ -0,0 +1 @@
+"""效能基準：合成資料產生器（bench.generate）與路由基準測試（bench.run）"""
@@ -0,0 +1,199 @@
+"""合成記帳資料產生器
+
+    python -m bench.generate --expenses 1000000 --years 5 --seed 42 --truncate
+
+依 5 個固定類別產生支出（各類別有自己的品項、頻率與金額分佈），
+每月依當月支出產生 1～3 筆還款，並零星加入調整項目；
+寫入後重建總額摘要/彙總/月底快照。相同 --seed 產生相同資料。
+需先執行 flask --app main init-db（建表與類別）。
+"""
+import argparse
+import math
+import random
+import time
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from sqlalchemy import delete, insert
+
+from app.database import Session
+from app.models import (
+    Expense, Repayment, Adjustment, CategoryEnum, LedgerSummary, MonthlyBalance, ExpenseRollup,
+    taipei_today,
+)
+from app.catalog import catalog
+from app import ledger, cache
+
+# 類別 → (出現權重, 品項, 金額中位數)
+CATEGORY_PROFILES = {
+    CategoryEnum.FOOD: (0.55, ['早餐', '午餐', '晚餐', '便當', '咖啡', '飲料', '宵夜', '超市採買', '水果', '麵包'], 120),
+    CategoryEnum.TRANSPORT: (0.20, ['捷運', '公車', '高鐵', '計程車', '加油', '停車費', 'YouBike'], 80),
+    CategoryEnum.DAILY_GOODS: (0.10, ['牙膏', '洗髮精', '文具', '電池', '藥品', '衣物'], 250),
+    CategoryEnum.HOUSEHOLD: (0.10, ['衛生紙', '洗衣精', '清潔劑', '垃圾袋', '廚房用品'], 300),
+    CategoryEnum.INTERNET_PHONE: (0.05, ['手機月租', '家用網路', '預付卡儲值', '雲端儲存'], 600),
+}
+
+ADJUSTMENT_DESCRIPTIONS = ['初始餘額', '記帳修正', '四捨五入差額', '退款', '優惠折抵']
+
+# 每幾筆支出產生一筆調整
+ADJUSTMENT_EVERY = 1000
+
+DEFAULT_CHUNK_SIZE = 10000
+
+
+def _amount(rng, median):
+    """對數常態分佈金額（右偏：多數小額、偶有大額），取整數元"""
+    return Decimal(max(1, round(rng.lognormvariate(math.log(median), 0.6))))
+
+
+def _uuid(rng):
+    """由種子亂數產生 id（同日期同建立日的列依 id 排序，模型預設的 uuid4 會讓每次順序不同）"""
+    return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+
+def expense_rows(rng, count, start, days, category_ids):
+    """逐筆產生支出列"""
+    categories = list(CATEGORY_PROFILES)
+    weights = [CATEGORY_PROFILES[category][0] for category in categories]
+
+    for _ in range(count):
+        category = rng.choices(categories, weights)[0]
+        _, items, median = CATEGORY_PROFILES[category]
+        day = start + timedelta(days=rng.randrange(days))
+        yield {
+            'id': _uuid(rng),
+            'category_id': category_ids[category],
+            'name': rng.choice(items),
+            'amount': _amount(rng, median),
+            'date': day,
+            'reviewed': rng.random() < 0.8,
+            # 多數當天記帳，少數晚 1～3 天補登
+            'created_at': day + timedelta(days=rng.choice((0, 0, 0, 0, 1, 2, 3))),
+            'updated_at': day,
+        }
+
+
+def repayment_rows(rng, monthly_totals):
+    """每月 1～3 筆還款，合計約當月支出的 90%～100%"""
+    for month, total in sorted(monthly_totals.items()):
+        parts = rng.randint(1, 3)
+        remaining = (total * Decimal(rng.uniform(0.9, 1.0))).quantize(Decimal('1'))
+        for index in range(parts):
+            amount = remaining if index == parts - 1 else (remaining / parts).quantize(Decimal('1'))
+            remaining -= amount
+            day = month + timedelta(days=rng.randrange(28))
+            if amount > 0:
+                yield {'id': _uuid(rng), 'amount': amount, 'date': day, 'created_at': day, 'updated_at': day}
+
+
+def adjustment_rows(rng, count, start, days):
+    for _ in range(count):
+        day = start + timedelta(days=rng.randrange(days))
+        sign = 1 if rng.random() < 0.6 else -1
+        yield {
+            'id': _uuid(rng),
+            'amount': sign * _amount(rng, 200),
+            'description': rng.choice(ADJUSTMENT_DESCRIPTIONS),
+            'date': day,
+            'created_at': day,
+            'updated_at': day,
+        }
+
+
+def _insert_chunked(db, model, rows, chunk_size, label):
+    """分批 executemany 寫入，每批 commit"""
+    started = time.perf_counter()
+    inserted = 0
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            db.execute(insert(model), chunk)
+            db.commit()
+            inserted += len(chunk)
+            chunk = []
+            rate = inserted / (time.perf_counter() - started)
+            print(f"\r  {label}: {inserted:,} 筆（{rate:,.0f} 筆/秒）", end='', flush=True)
+    if chunk:
+        db.execute(insert(model), chunk)
+        db.commit()
+        inserted += len(chunk)
+    print(f"\r  {label}: {inserted:,} 筆，{time.perf_counter() - started:.1f} 秒" + ' ' * 20)
+    return inserted
+
+
+def generate(db, expenses, years, seed, chunk_size=DEFAULT_CHUNK_SIZE):
+    """產生並寫入資料，回傳各表筆數"""
+    rng = random.Random(seed)
+    end = taipei_today()
+    days = max(1, years * 365)
+    start = end - timedelta(days=days - 1)
+
+    category_ids = {category: catalog.id_for(db, category) for category in CategoryEnum}
+    if any(category_id is None for category_id in category_ids.values()):
+        raise SystemExit("❌ 找不到類別，請先執行 flask --app main init-db")
+
+    monthly_totals = defaultdict(Decimal)
+
+    def tracked(rows):
+        for row in rows:
+            monthly_totals[row['date'].replace(day=1)] += row['amount']
+            yield row
+
+    counts = {
+        'expenses': _insert_chunked(
+            db, Expense, tracked(expense_rows(rng, expenses, start, days, category_ids)),
+            chunk_size, '支出'
+        ),
+    }
+    counts['repayments'] = _insert_chunked(
+        db, Repayment, repayment_rows(rng, monthly_totals), chunk_size, '還款'
+    )
+    counts['adjustments'] = _insert_chunked(
+        db, Adjustment, adjustment_rows(rng, max(1, expenses // ADJUSTMENT_EVERY), start, days),
+        chunk_size, '調整'
+    )
+
+    # 批次寫入不經 ORM flush，最後重建總額摘要/彙總/快照並讓快取失效
+    started = time.perf_counter()
+    ledger.rebuild(db)
+    cache.bump(db.connection(), set(ledger.LEDGER_MODELS.values()))
+    db.commit()
+    print(f"  總額摘要/彙總/快照重建：{time.perf_counter() - started:.1f} 秒")
+    return counts
+
+
+def truncate(db):
+    """清除所有記帳資料（保留類別）"""
+    for model in (Expense, Repayment, Adjustment, ExpenseRollup, MonthlyBalance, LedgerSummary):
+        db.execute(delete(model))
+    db.commit()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='產生合成記帳資料（基準測試用）')
+    parser.add_argument('--expenses', type=int, default=100000, help='支出筆數（1k～10M）')
+    parser.add_argument('--years', type=int, default=3, help='資料涵蓋年數（到今天為止）')
+    parser.add_argument('--seed', type=int, default=42, help='亂數種子（相同種子產生相同資料）')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='每批寫入筆數')
+    parser.add_argument('--truncate', action='store_true', help='先清除既有支出/還款/調整')
+    args = parser.parse_args(argv)
+
+    db = Session()
+    try:
+        if args.truncate:
+            truncate(db)
+            print("🗑️  已清除既有資料")
+        counts = generate(db, args.expenses, args.years, args.seed, args.chunk_size)
+        print(f"✅ 支出 {counts['expenses']:,} / 還款 {counts['repayments']:,} / 調整 {counts['adjustments']:,}")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+"""並行負載測試：長時間匯出進行中時，一般頁面的吞吐量是否隨執行緒數增加
+
+    # 對已啟動的伺服器
+    python -m bench.load --url http://localhost:8080 --concurrency 16 --exports 2
+
+    # 自動以不同執行緒數啟動 gunicorn（單一 worker）並比較
+    python -m bench.load --spawn-threads 1,2,4,8 --concurrency 16 --exports 2
+
+同時以 --exports 個客戶端不斷下載合併匯出（佔住 worker 的長請求），
+另以 --concurrency 個客戶端在 --duration 秒內不斷請求 --path，
+回報一般請求的每秒請求數與 p50/p95/p99 延遲。只使用標準函式庫。
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from bench.run import percentile
+
+EXPORT_PATH = '/reports/export?type=combined'
+
+
+def _fetch(url, timeout):
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        while response.read(65536):
+            pass
+        return response.status
+
+
+def run_load(base_url, path, concurrency, exports, duration, timeout=120):
+    """執行一輪負載，回傳統計"""
+    stop = threading.Event()
+    latencies = []
+    errors = []
+    exports_done = []
+    lock = threading.Lock()
+
+    def client():
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                _fetch(base_url + path, timeout)
+            except (urllib.error.URLError, OSError) as e:
+                with lock:
+                    errors.append(str(e))
+                continue
+            with lock:
+                latencies.append((time.perf_counter() - started) * 1000)
+
+    def exporter():
+        while not stop.is_set():
+            try:
+                _fetch(base_url + EXPORT_PATH, timeout)
+                with lock:
+                    exports_done.append(1)
+            except (urllib.error.URLError, OSError) as e:
+                with lock:
+                    errors.append(str(e))
+
+    workers = [threading.Thread(target=exporter, daemon=True) for _ in range(exports)]
+    workers += [threading.Thread(target=client, daemon=True) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    time.sleep(duration)
+    stop.set()
+    elapsed = time.perf_counter() - started
+    for worker in workers:
+        worker.join(timeout)
+
+    result = {
+        'requests': len(latencies),
+        'rps': round(len(latencies) / elapsed, 1),
+        'exports_completed': len(exports_done),
+        'errors': len(errors),
+    }
+    if latencies:
+        result.update({
+            'p50_ms': round(percentile(latencies, 50), 1),
+            'p95_ms': round(percentile(latencies, 95), 1),
+            'p99_ms': round(percentile(latencies, 99), 1),
+        })
+    return result
+
+
+def _wait_ready(base_url, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if _fetch(base_url + '/health', 2) == 200:
+                return
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.2)
+    raise RuntimeError(f"{base_url} 未在 {timeout} 秒內就緒")
+
+
+def spawn(app, threads, port, worker_class):
+    """以指定執行緒數啟動單一 worker 的 gunicorn"""
+    env = dict(os.environ, WORKERS='1', THREADS=str(threads), WORKER_CLASS=worker_class, PORT=str(port))
+    env.pop('DB_POOL_SIZE', None)
+    return subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py', app],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+
+def _print(label, result):
+    print(f"{label:<14} {result['rps']:>8.1f} req/s  p50 {result.get('p50_ms', 0):>7.1f} ms  "
+          f"p95 {result.get('p95_ms', 0):>7.1f} ms  p99 {result.get('p99_ms', 0):>7.1f} ms  "
+          f"匯出完成 {result['exports_completed']}  錯誤 {result['errors']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='並行負載測試')
+    parser.add_argument('--url', default='http://localhost:8080', help='伺服器網址（--spawn-threads 時忽略）')
+    parser.add_argument('--path', default='/expenses/', help='一般請求的路徑')
+    parser.add_argument('--concurrency', type=int, default=16, help='一般請求的並行客戶端數')
+    parser.add_argument('--exports', type=int, default=2, help='同時進行的長時間匯出數')
+    parser.add_argument('--duration', type=float, default=15, help='每輪秒數')
+    parser.add_argument('--spawn-threads', help='逗號分隔的執行緒數，逐一啟動 gunicorn 比較（例如 1,2,4,8）')
+    parser.add_argument('--worker-class', default='gthread', help='--spawn-threads 使用的 worker 類型')
+    parser.add_argument('--port', type=int, default=8181, help='--spawn-threads 使用的埠號')
+    parser.add_argument('--app', default='main:app', help='--spawn-threads 啟動的 WSGI app')
+    parser.add_argument('--output', help='結果 JSON 路徑')
+    args = parser.parse_args(argv)
+
+    results = {}
+    if args.spawn_threads:
+        base_url = f'http://127.0.0.1:{args.port}'
+        for threads in [int(value) for value in args.spawn_threads.split(',')]:
+            process = spawn(args.app, threads, args.port, args.worker_class)
+            try:
+                _wait_ready(base_url)
+                result = run_load(base_url, args.path, args.concurrency, args.exports, args.duration)
+            finally:
+                process.terminate()
+                process.wait()
+            results[f'threads={threads}'] = result
+            _print(f'threads={threads}', result)
+    else:
+        result = run_load(args.url.rstrip('/'), args.path, args.concurrency, args.exports, args.duration)
+        results[args.url] = result
+        _print(args.url, result)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
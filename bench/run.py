@@ -0,0 +1,212 @@
+"""路由基準測試：以 Flask test client 對本機資料庫逐一呼叫各頁面
+
+    python -m bench.run --iterations 30 --output bench/results/before.json
+    python -m bench.run --iterations 30 --compare bench/results/before.json
+
+每個情境先暖身，再量測 p50/p95/p99 延遲與每次請求的 SQL 語句數；
+另以 tracemalloc 單獨跑一次量測記憶體峰值（tracemalloc 會拖慢執行，不與延遲混在一起）。
+結果存成 JSON，--compare 可與先前結果比較。
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime
+from urllib.parse import urlencode
+
+from sqlalchemy import event, func, select
+
+from app import create_app
+from app.cache import report_cache
+from app.database import Session, get_engine
+from app.models import Expense, Repayment, Adjustment
+from app.pagination import keyset_page
+
+
+class StatementCounter:
+    """計算引擎執行的 SQL 語句數"""
+
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def _after_cursor_execute(self, *args):
+        self.count += 1
+
+
+def percentile(values, pct):
+    """最近秩百分位數"""
+    ordered = sorted(values)
+    index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def _get(client, path):
+    """發出請求並讀完整個回應（串流匯出也要送完才算）"""
+    response = client.get(path)
+    size = len(response.get_data())
+    response.close()
+    if response.status_code != 200:
+        raise RuntimeError(f"{path} 回應 {response.status_code}")
+    return size
+
+
+def _cursor_for_page(page):
+    """沿「下一頁」游標走到第 page 頁，回傳該頁的列表網址"""
+    db = Session()
+    try:
+        cursor = None
+        for _ in range(page - 1):
+            pager = keyset_page(db.query(Expense), Expense, cursor, with_total=cursor is None)
+            if pager.next_cursor is None:
+                break
+            cursor = pager.next_cursor
+    finally:
+        db.close()
+    return f'/expenses/?{urlencode({"cursor": cursor})}' if cursor else '/expenses/'
+
+
+def scenarios(page):
+    """情境名稱 → 網址"""
+    return {
+        'home.index': '/',
+        'expenses.index': '/expenses/',
+        f'expenses.index page {page} (cursor)': _cursor_for_page(page),
+        f'expenses.index page {page} (offset)': f'/expenses/?page={page}',
+        # 報表頁只輸出框架，彙總在各圖表 JSON 端點（預設本月 / 全部期間）
+        'reports.index (shell)': '/reports/',
+        'reports.chart pie': '/reports/charts/pie',
+        'reports.chart pie (all time)': '/reports/charts/pie?preset=all',
+        'reports.chart bar': '/reports/charts/bar',
+        'reports.chart bar (all time)': '/reports/charts/bar?preset=all',
+        'reports.chart line': '/reports/charts/line',
+        'reports.chart line (all time)': '/reports/charts/line?preset=all',
+        'reports.export expenses': '/reports/export?type=expenses',
+        'reports.export combined': '/reports/export?type=combined',
+    }
+
+
+def measure(client, counter, path, iterations, warmup, cold_cache):
+    for _ in range(warmup):
+        _get(client, path)
+
+    latencies = []
+    statements = []
+    size = 0
+    for _ in range(iterations):
+        if cold_cache:
+            report_cache.clear()
+        counter.count = 0
+        started = time.perf_counter()
+        size = _get(client, path)
+        latencies.append((time.perf_counter() - started) * 1000)
+        statements.append(counter.count)
+
+    if cold_cache:
+        report_cache.clear()
+    tracemalloc.start()
+    _get(client, path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'path': path,
+        'iterations': iterations,
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'mean_ms': round(sum(latencies) / len(latencies), 2),
+        'max_ms': round(max(latencies), 2),
+        'queries': round(sum(statements) / len(statements), 1),
+        'peak_kb': round(peak / 1024, 1),
+        'bytes': size,
+    }
+
+
+def environment():
+    """執行環境與資料量（比較結果時確認條件相同）"""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    db = Session()
+    try:
+        rows = {
+            model.__tablename__: db.execute(select(func.count()).select_from(model)).scalar()
+            for model in (Expense, Repayment, Adjustment)
+        }
+    finally:
+        db.close()
+
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'database': get_engine().dialect.name,
+        'rows': rows,
+    }
+
+
+def compare(results, baseline):
+    """印出與先前結果的 p50/p95/查詢數差異"""
+    print(f"\n與 {baseline['environment'].get('commit')}（{baseline['environment']['timestamp']}）比較：")
+    for name, result in results.items():
+        before = baseline['results'].get(name)
+        if not before:
+            continue
+        changes = []
+        for key in ('p50_ms', 'p95_ms', 'queries', 'peak_kb'):
+            if before[key]:
+                changes.append(f"{key} {(result[key] - before[key]) / before[key]:+.0%}")
+        print(f"  {name:<36} {'  '.join(changes)}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='路由基準測試')
+    parser.add_argument('--iterations', type=int, default=30, help='每個情境量測次數')
+    parser.add_argument('--warmup', type=int, default=3, help='每個情境暖身次數')
+    parser.add_argument('--page', type=int, default=20, help='列表深頁的頁碼')
+    parser.add_argument('--only', action='append', default=[], help='只跑名稱包含此字串的情境（可重複）')
+    parser.add_argument('--cold-cache', action='store_true', help='每次請求前清空報表快取')
+    parser.add_argument('--output', help='結果 JSON 路徑（預設 bench/results/<時間>.json）')
+    parser.add_argument('--compare', help='與先前的結果 JSON 比較')
+    args = parser.parse_args(argv)
+
+    app = create_app()
+    client = app.test_client()
+    counter = StatementCounter(get_engine())
+
+    results = {}
+    for name, path in scenarios(args.page).items():
+        if args.only and not any(part in name for part in args.only):
+            continue
+        try:
+            result = measure(client, counter, path, args.iterations, args.warmup, args.cold_cache)
+        except Exception as e:
+            print(f"❌ {name}: {e}")
+            continue
+        results[name] = result
+        print(f"{name:<36} p50 {result['p50_ms']:>8.1f} ms  p95 {result['p95_ms']:>8.1f} ms  "
+              f"p99 {result['p99_ms']:>8.1f} ms  {result['queries']:>5} 查詢  峰值 {result['peak_kb']:>9,.0f} KB")
+
+    report = {'environment': environment(), 'cold_cache': args.cold_cache, 'results': results}
+    output = args.output or os.path.join('bench', 'results', f"{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n📄 結果已存到 {output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(results, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
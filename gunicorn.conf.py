@@ -0,0 +1,69 @@
+"""Gunicorn 設定（gunicorn --config gunicorn.conf.py main:app）
+
+preload_app：主行程 import 一次 app 後 fork 出 worker，worker 啟動不需重新 import，
+也不連資料庫（建表/種子資料改由 flask init-db 執行）。
+
+WORKER_CLASS：
+- gthread（預設）：每個 worker THREADS 條執行緒，長時間匯出只佔一條執行緒
+- gevent：每個 worker 最多 WORKER_CONNECTIONS 個 greenlet，需安裝 requirements-gevent.txt
+- sync：每個 worker 一次只處理一個請求
+"""
+import os
+import shutil
+
+# Prometheus multiprocess 模式：需在 import prometheus_client 之前設定
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/prometheus_multiproc')
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8080')}"
+workers = int(os.getenv('WORKERS', '4'))
+worker_class = os.getenv('WORKER_CLASS', 'gthread')
+threads = int(os.getenv('THREADS', '4')) if worker_class == 'gthread' else 1
+worker_connections = int(os.getenv('WORKER_CONNECTIONS', '100'))
+timeout = 120
+accesslog = '-'
+errorlog = '-'
+
+preload_app = True
+
+if worker_class == 'gthread':
+    # 每條執行緒同時最多用一條連線，常駐連線數預設與執行緒數相同，避免排隊等連線
+    os.environ.setdefault('DB_POOL_SIZE', str(threads))
+elif worker_class == 'gevent':
+    # preload_app 會在 gunicorn 的 gevent worker patch 之前就 import app，
+    # 必須在這裡先 patch：scoped_session 的 threading.local、連線池與快取的鎖才會以 greenlet 為單位
+    try:
+        from gevent import monkey
+        # psycopg2 是 C 擴充，未 patch 時查詢會卡住整個 worker 的所有 greenlet
+        from psycogreen.gevent import patch_psycopg
+    except ImportError as e:
+        raise RuntimeError(
+            f"WORKER_CLASS=gevent 需要 gevent 與 psycogreen（{e.name} 未安裝），"
+            "請執行 pip install -r requirements-gevent.txt"
+        ) from e
+    monkey.patch_all()
+    patch_psycopg()
+    os.environ.setdefault('DB_POOL_SIZE', '10')
+
+
+def post_fork(server, worker):
+    """fork 後捨棄主行程可能已建立的連線，每個 worker 各自建立連線池（可選預熱）"""
+    from app.database import dispose_engine, warm_up_engine
+
+    dispose_engine()
+    warmed = warm_up_engine()
+    if warmed:
+        server.log.info("worker %s: 已預先建立 %d 條資料庫連線", worker.pid, warmed)
+
+
+def on_starting(server):
+    """清空上次執行留下的指標檔案"""
+    directory = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory, exist_ok=True)
+
+
+def child_exit(server, worker):
+    """worker 結束時移除其 livesum gauge（進行中請求數），計數器保留累計值"""
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,11 @@
+/** Tailwind 設定：掃描模板與前端腳本中用到的 class，只輸出實際用到的樣式 */
+module.exports = {
+  content: [
+    './app/templates/**/*.html',
+    './app/static/js/**/*.js',
+  ],
+  theme: {
+    extend: {},
+  },
+  plugins: [],
+}
@@ -0,0 +1,40 @@
+from app.models import Adjustment, Expense, Repayment
+
+
+def test_batch_reports_invalid_items_and_accepts_the_rest(client, db):
+    response = client.post('/api/batch', json={
+        'expenses': [
+            {'date': '2024-03-01', 'category': '伙食', 'name': '早餐', 'amount': 45},
+            {'date': '2024-03-01', 'category': '伙食', 'name': 123, 'amount': 10},
+            {'date': 20240301, 'category': '交通', 'name': '公車', 'amount': '15'},
+            {'date': '2024-03-02', 'category': ['伙食'], 'name': '午餐', 'amount': 80},
+        ],
+        'repayments': [
+            {'date': '2024-03-05', 'amount': '500'},
+            {'date': '2024-03-05', 'amount': {'value': 1}},
+            {'date': '2024-03-05', 'amount': True},
+        ],
+        'adjustments': [
+            {'date': '2024-03-06', 'description': '利息', 'amount': 1.5},
+            {'date': '2024-03-06', 'description': 42, 'amount': 1},
+        ],
+    })
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['inserted'] == 3
+    assert body['errors'] == 6
+
+    assert 'id' in body['expenses'][0]
+    assert body['expenses'][1]['error'] == '名稱必須是字串'
+    assert body['expenses'][2]['error'] == '日期必須是字串'
+    assert body['expenses'][3]['error'] == '類別必須是字串'
+    assert 'id' in body['repayments'][0]
+    assert body['repayments'][1]['error'] == '金額必須是數字或字串'
+    assert body['repayments'][2]['error'] == '金額必須是數字或字串'
+    assert 'id' in body['adjustments'][0]
+    assert body['adjustments'][1]['error'] == '說明必須是字串'
+
+    assert db.query(Expense).count() == 1
+    assert db.query(Repayment).count() == 1
+    assert db.query(Adjustment).count() == 1
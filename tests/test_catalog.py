@@ -0,0 +1,27 @@
+from sqlalchemy import update
+
+from app import cache
+from app.catalog import catalog
+from app.models import Category, CategoryEnum
+
+
+def _set_active_elsewhere(db, name, active):
+    """模擬另一個 worker 修改類別：本行程的 after_flush 不會觸發，只有版本戳記會變"""
+    db.execute(update(Category).where(Category.name == name).values(active=active))
+    cache.bump(db.connection(), {'categories'})
+    db.commit()
+
+
+def test_catalog_reloads_when_another_worker_changes_categories(app, db):
+    with app.test_request_context():
+        assert CategoryEnum.TRANSPORT in [info.name for info in catalog.active(db)]
+
+    _set_active_elsewhere(db, CategoryEnum.TRANSPORT, False)
+    try:
+        with app.test_request_context():
+            assert CategoryEnum.TRANSPORT not in [info.name for info in catalog.active(db)]
+    finally:
+        _set_active_elsewhere(db, CategoryEnum.TRANSPORT, True)
+
+    with app.test_request_context():
+        assert CategoryEnum.TRANSPORT in [info.name for info in catalog.active(db)]
@@ -0,0 +1,56 @@
+from datetime import date
+from decimal import Decimal
+
+from app import ledger
+from app.catalog import catalog
+from app.models import CategoryEnum, Expense, ExpenseRollup, LedgerSummary, MonthlyBalance
+
+
+def _totals(db):
+    """總額摘要、類別×月份彙總與總額月底快照的目前值"""
+    db.expire_all()
+    summary = db.get(LedgerSummary, ledger.SUMMARY_ID)
+    rollups = {
+        (row.category_id, row.month): (row.total, row.count)
+        for row in db.query(ExpenseRollup)
+    }
+    closings = {
+        row.month: row.closing
+        for row in db.query(MonthlyBalance).filter(MonthlyBalance.scope == ledger.OVERALL_SCOPE)
+    }
+    return summary.total_expenses, rollups, closings
+
+
+def test_bulk_delete_removes_selected_rows_and_updates_ledger(client, db):
+    food = catalog.id_for(db, CategoryEnum.FOOD)
+    transport = catalog.id_for(db, CategoryEnum.TRANSPORT)
+    january = Expense(category_id=food, name='午餐', amount=Decimal('100'), date=date(2024, 1, 10))
+    february = Expense(category_id=transport, name='高鐵', amount=Decimal('50'), date=date(2024, 2, 5))
+    kept = Expense(category_id=food, name='晚餐', amount=Decimal('30'), date=date(2024, 2, 6))
+    db.add_all([january, february, kept])
+    db.commit()
+    selected = [str(january.id), str(february.id)]
+    kept_id = kept.id
+    total_before, rollups_before, closings_before = _totals(db)
+
+    response = client.post('/expenses/bulk', data={'action': 'delete', 'ids': selected})
+
+    assert response.status_code == 302
+    db.expire_all()
+    assert [expense.id for expense in db.query(Expense)] == [kept_id]
+
+    total_after, rollups_after, closings_after = _totals(db)
+    assert total_after == total_before - Decimal('150')
+
+    jan, feb = date(2024, 1, 1), date(2024, 2, 1)
+    assert rollups_after[(food, jan)] == (rollups_before[(food, jan)][0] - 100, rollups_before[(food, jan)][1] - 1)
+    assert rollups_after[(transport, feb)] == (
+        rollups_before[(transport, feb)][0] - 50, rollups_before[(transport, feb)][1] - 1
+    )
+    assert rollups_after[(food, feb)] == rollups_before[(food, feb)]
+
+    # 月底快照為累積值：一月起少 100，二月起再少 50
+    assert closings_after[jan] == closings_before[jan] - 100
+    assert closings_after[feb] == closings_before[feb] - 150
+
+    assert ledger.verify(db) == {}
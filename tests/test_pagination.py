@@ -0,0 +1,40 @@
+from datetime import date
+from decimal import Decimal
+from types import SimpleNamespace
+from uuid import UUID
+
+from app.models import Repayment
+from app.pagination import encode_cursor
+
+
+def _stale_cursor():
+    """指向所有資料之前的游標（資料已刪除/游標過期時的情況）"""
+    row = SimpleNamespace(date=date(2000, 1, 1), created_at=date(2000, 1, 1), id=UUID(int=0))
+    return encode_cursor('next', row, 3, 1)
+
+
+def test_empty_cursor_page_links_back_to_first_page(client, db):
+    db.add(Repayment(amount=Decimal('10'), date=date(2024, 5, 1)))
+    db.commit()
+
+    response = client.get('/repayments/', query_string={'cursor': _stale_cursor()})
+
+    assert response.status_code == 200
+    assert '<a href="/repayments/" class="text-blue-600 hover:text-blue-900">« 首頁</a>' in response.get_data(as_text=True)
+
+
+def test_first_page_has_no_first_page_link(client, db):
+    db.add(Repayment(amount=Decimal('10'), date=date(2024, 5, 1)))
+    db.commit()
+
+    response = client.get('/repayments/')
+
+    assert '« 首頁</a>' not in response.get_data(as_text=True)
+
+
+def test_expense_list_shows_first_page_link_outside_noscript_for_cursor_urls(client, db):
+    response = client.get('/expenses/', query_string={'cursor': _stale_cursor()})
+
+    html = response.get_data(as_text=True)
+    assert '<a href="/expenses/" class="text-blue-600 hover:text-blue-900">« 首頁</a>' in html
+    assert '<noscript>' not in html
@@ -0,0 +1,42 @@
+import csv
+import io
+from datetime import date
+from decimal import Decimal
+
+from app.catalog import catalog
+from app.models import Adjustment, CategoryEnum, Expense, Repayment
+
+
+def _csv(response):
+    return list(csv.reader(io.StringIO(response.get_data().decode('utf-8-sig'))))
+
+
+def test_combined_export_with_date_range(client, db):
+    food = catalog.id_for(db, CategoryEnum.FOOD)
+    db.add_all([
+        Expense(category_id=food, name='範圍前', amount=Decimal('100'), date=date(2024, 1, 5)),
+        Repayment(amount=Decimal('30'), date=date(2024, 1, 10)),
+        Expense(category_id=food, name='午餐', amount=Decimal('12.50'), date=date(2024, 1, 15)),
+        Adjustment(description='手續費', amount=Decimal('-5'), date=date(2024, 1, 20)),
+        Expense(category_id=food, name='範圍後', amount=Decimal('40'), date=date(2024, 2, 1)),
+    ])
+    db.commit()
+
+    response = client.get('/reports/export?type=combined&start_date=2024-01-10&end_date=2024-01-31')
+
+    assert response.status_code == 200
+    rows = _csv(response)
+    assert rows[0] == ['類型', '日期', '類別', '名稱/說明', '金額', '累積餘額']
+    # 累積餘額從範圍開始前的餘額（100）起算
+    assert rows[1:] == [
+        ['還款', '2024-01-10', '', '', '30.00', '70.00'],
+        ['支出', '2024-01-15', '伙食', '午餐', '12.50', '82.50'],
+        ['調整', '2024-01-20', '', '手續費', '-5.00', '77.50'],
+    ]
+
+
+def test_combined_export_with_preset(client, db):
+    response = client.get('/reports/export?type=combined&preset=this_month')
+
+    assert response.status_code == 200
+    assert _csv(response) == [['類型', '日期', '類別', '名稱/說明', '金額', '累積餘額']]